@@ -0,0 +1,122 @@
+"""
+Benchmark of the hydraulic quantities of prismatic sections (rectangular and trapezoidal) :
+- number of point lists built (wet sections, point copies) by one compute_depth, it must be 0,
+- time and peak of allocated memory of one compute_depth,
+- time of one evaluation of b, S, P, R, Fr, Sf, Fs with the direct formulas and with wet points (generic path of IrregularSection).
+
+usage (from the root of the repository) : python benchmarks/prismatic_hydraulics.py [nb_section]
+"""
+import os
+import sys
+import io
+import contextlib
+import tracemalloc
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prettytable import PrettyTable
+from src.depthCache import DepthCache
+from src.granulometry import Granulometry
+from src.irregularSection import IrregularSection
+from src.profile import Profile
+from src.rectangularSection import RectangularSection
+from src.trapezoidalSection import TrapezoidalSection
+
+Q = 6
+NB_REPEAT = 5
+GRANULOMETRY = Granulometry(dm=0.1, d30=0.05, d50=0.1, d90=0.3, d84tb=0.2, d84bs=0.2, Gr=2)
+
+def build_profile(section, nb_section):
+    """profile of nb_section sections (1 m apart) with a slope break and a narrowing"""
+    section_list = []
+    for i in range(nb_section):
+        x = float(i)
+        z = 100 - 0.05*x - (0.5 if i > nb_section//2 else 0)
+        b = 5 + (2 if nb_section//5 < i < nb_section//4 else 0)
+        if section == "rectangular":
+            section_list.append(RectangularSection(x, z, b, granulometry=GRANULOMETRY))
+        else:
+            section_list.append(TrapezoidalSection(x, z, b, 0.5, granulometry=GRANULOMETRY, manning=0.05))
+    return Profile(section_list)
+
+class ListCounter:
+    """count the calls of the methods building point lists while it is active"""
+    METHOD_LIST = [(IrregularSection, "get_wet_section"), (IrregularSection, "get_points"), (RectangularSection, "get_wet_section"), (TrapezoidalSection, "get_wet_section")]
+
+    def __init__(self):
+        self.count = 0
+        self.__saved = []
+
+    def __enter__(self):
+        for cls, name in ListCounter.METHOD_LIST:
+            method = cls.__dict__[name]
+            self.__saved.append((cls, name, method))
+            setattr(cls, name, self.__counted(method))
+        return self
+
+    def __exit__(self, *args):
+        for cls, name, method in self.__saved:
+            setattr(cls, name, method)
+
+    def __counted(self, method):
+        def wrapper(*args, **kargs):
+            self.count += 1
+            return method(*args, **kargs)
+        return wrapper
+
+def bench_compute_depth(profile):
+    """lists built, mean time and peak memory of compute_depth (cache disabled : every depth is computed)"""
+    enabled = DepthCache.enabled
+    DepthCache.enabled = False
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            profile.compute_depth(Q)
+            with ListCounter() as counter:
+                profile.compute_depth(Q)
+            t0 = perf_counter()
+            for _ in range(NB_REPEAT):
+                profile.compute_depth(Q)
+            mean_time = (perf_counter()-t0)/NB_REPEAT
+            tracemalloc.start()
+            profile.compute_depth(Q)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    finally:
+        DepthCache.enabled = enabled
+    return counter.count, mean_time, peak
+
+def bench_evaluation(section, nb_evaluation=2000):
+    """time of one evaluation of the hydraulic quantities with the direct formulas and with wet points"""
+    y_list = [0.05 + 2*k/nb_evaluation for k in range(nb_evaluation)]
+    t0 = perf_counter()
+    for y in y_list:
+        section.get_b(y); section.get_S(y); section.get_P(y); section.get_R(y)
+        section.get_Fr(Q, y); section.get_Sf(Q, y); section.get_Fs(Q, y)
+    direct = (perf_counter()-t0)/nb_evaluation
+    t0 = perf_counter()
+    for y in y_list:
+        wet_points = section.get_wet_section(y)
+        IrregularSection.get_b(section, y, wet_points); IrregularSection.get_S(section, y, wet_points); IrregularSection.get_P(section, y, wet_points)
+        IrregularSection.get_R(section, y, wet_points); IrregularSection.get_Fr(section, Q, y, wet_points)
+        IrregularSection.get_Sf(section, Q, y, wet_points); IrregularSection.get_Fs(section, Q, y, wet_points)
+    generic = (perf_counter()-t0)/nb_evaluation
+    return direct, generic
+
+def run(nb_section=1000):
+    """return the rows of the benchmark : [section, lists built, time, peak memory, direct evaluation, generic evaluation]"""
+    row_list = []
+    for section in ("rectangular", "trapezoidal"):
+        profile = build_profile(section, nb_section)
+        nb_list, mean_time, peak = bench_compute_depth(profile)
+        direct, generic = bench_evaluation(profile.get_section(nb_section//2))
+        row_list.append([section, nb_list, mean_time, peak, direct, generic])
+    return row_list
+
+if __name__ == "__main__":
+    nb_section = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    table = PrettyTable(["section", "point lists built by compute_depth", "compute_depth (ms)", "peak memory (kB)", "direct evaluation (us)", "evaluation with wet points (us)"])
+    for section, nb_list, mean_time, peak, direct, generic in run(nb_section):
+        table.add_row([section, nb_list, f"{1e3*mean_time:.2f}", f"{peak/1e3:.1f}", f"{1e6*direct:.2f}", f"{1e6*generic:.2f}"])
+    print(f"{nb_section} sections, Q={Q}m3/s")
+    print(table)
@@ -0,0 +1,98 @@
+"""
+Check of the checkpoint and resume of an event (see Profile.compute_event) : an event is interrupted at the step NB_STEP_BEFORE_KILL
+(a KeyboardInterrupt raised by its ResultWriter, with a checkpoint saved on every step), resumed from its checkpoint, and compared with
+the same event computed without interruption. It is checked with and without the multirate time scheme. The telemetry of the
+interrupted event must be closed and, once resumed, have one record per step of the uninterrupted event.
+
+usage (from the root of the repository) : python benchmarks/resume.py
+The exit code is 1 if a resumed event fails or does not give the result of the uninterrupted one.
+"""
+import os
+import sys
+import io
+import shutil
+import tempfile
+import contextlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+from src.granulometry import Granulometry
+from src.profile import Profile
+from src.rectangularSection import RectangularSection
+from src.resultWriter import ResultWriter
+from src.run import build_transport_law
+from src.telemetry import Telemetry
+from src.utils import hydrogrammeLavabre
+
+NB_SECTION = 200
+NB_STEP_BEFORE_KILL = 50
+EVENT_DURATION = 60 # s
+TOLERANCE = 1e-6 # m, bed elevations of the resumed and uninterrupted events
+GRANULOMETRY = Granulometry(dm=0.1, d30=0.05, d50=0.1, d90=0.3, d84tb=0.2, d84bs=0.2, Gr=2)
+
+class KilledWriter(ResultWriter):
+    """ResultWriter interrupting the computation when it is asked to write the row nb_row"""
+
+    def __init__(self, folder, nb_row):
+        super().__init__(folder)
+        self.__nb_row = nb_row
+
+    def write(self, t, Q, y, z, H, force=False):
+        if self.get_nb_row() == self.__nb_row:
+            raise(KeyboardInterrupt())
+        return super().write(t, Q, y, z, H, force=force)
+
+def build_profile():
+    section_list = [RectangularSection(i, 100 - 0.05*i - (0.5 if i > NB_SECTION//2 else 0), 5, z_min=98 - 0.05*i, granulometry=GRANULOMETRY) for i in range(NB_SECTION)]
+    return Profile(section_list)
+
+def compute(folder, multirate, kill=False, resume=False):
+    t = np.linspace(0, EVENT_DURATION, 61)
+    hydrogram = hydrogrammeLavabre(6, EVENT_DURATION/3, 2, 1, t)
+    writer = KilledWriter(folder, NB_STEP_BEFORE_KILL) if kill else ResultWriter(folder)
+    telemetry = Telemetry(os.path.join(folder, "telemetry.bin"))
+    with contextlib.redirect_stdout(io.StringIO()):
+        return build_profile().compute_event(hydrogram, t, build_transport_law("Lefort2015"), writer=writer, telemetry=telemetry, checkpoint=os.path.join(folder, "checkpoint.npz"), checkpoint_period=0, resume=resume, multirate=multirate)
+
+def check(multirate):
+    """return the list of errors of an interrupted and resumed event"""
+    folder = tempfile.mkdtemp()
+    try:
+        reference = compute(os.path.join(folder, "reference"), multirate)
+        resumed_folder = os.path.join(folder, "resumed")
+        try:
+            compute(resumed_folder, multirate, kill=True)
+            return ["the event has not been interrupted"]
+        except KeyboardInterrupt:
+            pass
+        if Telemetry.counter is not None:
+            return ["the telemetry of the interrupted event has not been closed"]
+        try:
+            resumed = compute(resumed_folder, multirate, resume=True)
+        except Exception as error:
+            return [f"the resumed event failed : {type(error).__name__} : {error}"]
+        error_list = []
+        if len(resumed["time"]) != len(reference["time"]):
+            error_list.append(f"{len(resumed['time'])} rows instead of {len(reference['time'])}")
+        dz = np.max(np.abs(np.asarray(resumed["bottom_height"][-1]) - np.asarray(reference["bottom_height"][-1])))
+        if dz > TOLERANCE:
+            error_list.append(f"final bed differs by {dz:.3g}m")
+        if abs(resumed["volume_out"] - reference["volume_out"]) > TOLERANCE*abs(reference["volume_out"]):
+            error_list.append(f"volume out {resumed['volume_out']:.6g} instead of {reference['volume_out']:.6g}")
+        nb_record = len(Telemetry.load(os.path.join(resumed_folder, "telemetry.bin")))
+        if nb_record != len(reference["time"])-1:
+            error_list.append(f"{nb_record} telemetry records instead of {len(reference['time'])-1}")
+        return error_list
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+if __name__ == "__main__":
+    nb_error = 0
+    for multirate in (False, True):
+        error_list = check(multirate)
+        print(f"multirate={multirate} : {'ok' if len(error_list) == 0 else 'ERROR : ' + ', '.join(error_list)}")
+        nb_error += len(error_list)
+    if nb_error > 0:
+        sys.exit(1)
@@ -0,0 +1,70 @@
+"""
+Benchmark of the startup time of the command line interface :
+- import time of the modules used by evofond.py, each one in a new interpreter (median of NB_REPEAT runs),
+- heavy modules (matplotlib, scipy, prettytable) loaded by these imports : none of them must be loaded before a command needs it,
+- wall time of a whole command (python evofond.py -l).
+
+usage (from the root of the repository) : python benchmarks/startup.py
+The exit code is 1 if a heavy module is imported at startup.
+"""
+import os
+import sys
+import json
+import subprocess
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+NB_REPEAT = 5
+MODULE_LIST = ["evofond", "src.run", "src.ensemble", "src.profile", "src.resultFile"]
+HEAVY_MODULE_LIST = ["matplotlib", "mpl_toolkits", "scipy", "prettytable"]
+IMPORT_SCRIPT = """
+import sys, json
+from time import perf_counter
+t0 = perf_counter()
+import {module}
+print(json.dumps([perf_counter()-t0, [name for name in {heavy} if name in sys.modules]]))
+"""
+
+def median(value_list):
+    value_list = sorted(value_list)
+    return value_list[len(value_list)//2]
+
+def bench_import(module):
+    """median import time of module in a new interpreter and heavy modules it loads"""
+    time_list = []
+    for _ in range(NB_REPEAT):
+        output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT.format(module=module, heavy=HEAVY_MODULE_LIST)], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        import_time, heavy_list = json.loads(output.splitlines()[-1])
+        time_list.append(import_time)
+    return median(time_list), heavy_list
+
+def bench_command(command):
+    """median wall time of a command of evofond.py (interpreter startup included)"""
+    time_list = []
+    for _ in range(NB_REPEAT):
+        t0 = perf_counter()
+        subprocess.run([sys.executable, os.path.join(ROOT, "evofond.py")] + command, cwd=ROOT, capture_output=True, check=True)
+        time_list.append(perf_counter()-t0)
+    return median(time_list)
+
+def run():
+    """return the rows of the benchmark : [what is measured, time, heavy modules loaded]"""
+    row_list = []
+    for module in MODULE_LIST:
+        import_time, heavy_list = bench_import(module)
+        row_list.append([f"import {module}", import_time, heavy_list])
+    row_list.append(["python evofond.py -l", bench_command(["-l"]), []])
+    return row_list
+
+if __name__ == "__main__":
+    from prettytable import PrettyTable
+    table = PrettyTable(["measure", "time (ms)", "heavy modules loaded"])
+    row_list = run()
+    for name, duration, heavy_list in row_list:
+        table.add_row([name, f"{1e3*duration:.1f}", ", ".join(heavy_list) if heavy_list else "-"])
+    print(table)
+    if any(heavy_list for _, _, heavy_list in row_list):
+        print("ERROR : heavy modules are imported at startup")
+        sys.exit(1)
@@ -0,0 +1,244 @@
+"""
+Benchmark suite of the solver on reference scenarios : synthetic rectangular, trapezoidal and irregular profiles of 100, 1000 and
+10000 sections (1 m apart, with a slope break and a narrowing) and Lavabre hydrograms (see utils.hydrogrammeLavabre).
+Cases :
+- compute_depth (depth cache cleared before each run), find_best_dt, get_y_from_Hs (one call, both regimes),
+- complete (profile of nb_section/10 sections completed with dx=1m),
+- update_bottom with every sediment transport law and full events (compute_event) with every law on the 1000 sections profile,
+  and with Lefort2015 on every profile. Only rectangular sections have a bed evolution : the other profiles only run the hydraulic
+  cases.
+For each case : median time of NB_REPEAT runs and peak of allocated memory (one more run with tracemalloc). Events are run once, in a
+new process (tracemalloc would slow them down too much) : their peak memory is the growth of the resident memory of this process
+during the event, and their speed is given in steps/s.
+
+usage (from the root of the repository) :
+    python benchmarks/suite.py [--quick] [--filter TEXT] [--save NAME] [--compare NAME] [--threshold 0.1]
+--filter only runs the cases having every part of TEXT among the parts of their name (event/1000, rectangular, compute_depth...),
+--save stores the results as the baseline benchmarks/baselines/NAME.json, --compare prints the comparison with a stored baseline
+(the exit code is 1 if a case is slower than the baseline by more than threshold, relative). --quick skips the 10000 sections profiles.
+Baselines are only comparable on the same machine : the machine description is stored with them and checked by --compare.
+"""
+import os
+import sys
+import io
+import json
+import argparse
+import functools
+import platform
+import contextlib
+import resource
+import tracemalloc
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+from src.depthCache import DepthCache
+from src.granulometry import Granulometry
+from src.irregularSection import IrregularSection
+from src.profile import Profile
+from src.rectangularSection import RectangularSection
+from src.trapezoidalSection import TrapezoidalSection
+from src.run import TRANSPORT_LAW_DICT, build_transport_law
+from src.utils import hydrogrammeLavabre
+
+BASELINE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+SECTION_LIST = ("rectangular", "trapezoidal", "irregular")
+SIZE_LIST = (100, 1000, 10000)
+LAW_SIZE = 1000 # size of the profiles used to compare the sediment transport laws
+DEFAULT_LAW = "Lefort2015"
+NB_REPEAT = 3
+Q = 6
+EVENT_DURATION = 60 # s, Lavabre hydrogram of the events
+GRANULOMETRY = Granulometry(dm=0.1, d30=0.05, d50=0.1, d90=0.3, d84tb=0.2, d84bs=0.2, Gr=2)
+IRREGULAR_POINTS = [(0, 3), (1, 1), (2, 0.2), (3, 0), (5, 0.1), (6, 1.5), (7, 3)]
+
+def build_section(section, x, z, narrow=False):
+    b = 5 + (2 if narrow else 0)
+    if section == "rectangular":
+        return RectangularSection(x, z, b, z_min=z-2, granulometry=GRANULOMETRY)
+    if section == "trapezoidal":
+        return TrapezoidalSection(x, z, b, 0.5, z_min=z-2, granulometry=GRANULOMETRY, manning=0.05)
+    return IrregularSection([(px*b/5, py) for px, py in IRREGULAR_POINTS], x, z, z_min=z-2, granulometry=GRANULOMETRY, manning=0.05)
+
+def build_profile(section, nb_section, dx=1):
+    """profile of nb_section sections dx apart, with a slope break at the middle and a narrowing between 1/5 and 1/4 of its length"""
+    section_list = []
+    for i in range(nb_section):
+        x = dx*i
+        z = 100 - 0.05*x - (0.5 if i > nb_section//2 else 0)
+        section_list.append(build_section(section, x, z, narrow=(nb_section//5 < i < nb_section//4)))
+    return Profile(section_list)
+
+def build_hydrogram():
+    t = np.linspace(0, EVENT_DURATION, 61)
+    return hydrogrammeLavabre(Q, EVENT_DURATION/3, 2, 1, t), t
+
+def measure(function, nb_repeat=NB_REPEAT, setup=None):
+    """median time of nb_repeat calls of function (setup is called before each one, untimed), peak memory and last result"""
+    time_list = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(nb_repeat):
+            if setup is not None:
+                setup()
+            t0 = perf_counter()
+            result = function()
+            time_list.append(perf_counter()-t0)
+        if setup is not None:
+            setup()
+        tracemalloc.start()
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return float(np.median(time_list)), peak, result
+
+@functools.lru_cache(maxsize=1)
+def get_profile(section, nb_section):
+    """profile shared by the hydraulic cases of the same size (they do not modify it)"""
+    return build_profile(section, nb_section)
+
+def bench_compute_depth(section, nb_section):
+    profile = get_profile(section, nb_section)
+    duration, peak, _ = measure(lambda: profile.compute_depth(Q), setup=DepthCache.clear)
+    return duration, peak, None
+
+def bench_find_best_dt(section, nb_section):
+    profile = get_profile(section, nb_section)
+    y_list = profile.compute_depth(Q)
+    duration, peak, _ = measure(lambda: profile.find_best_dt(Q, y_list))
+    return duration, peak, None
+
+def bench_complete(section, nb_section):
+    """profile of nb_section/10 sections 10 m apart completed with dx=1m"""
+    coarse = build_profile(section, nb_section//10+1, dx=10)
+    copy_list = []
+    duration, peak, _ = measure(lambda: copy_list[-1].complete(1), setup=lambda: copy_list.append(coarse.copy(share_geometry=True)))
+    return duration, peak, None
+
+def bench_get_y_from_Hs(section, nb_section, nb_call=200):
+    """one call of get_y_from_Hs (mean of nb_call calls on both regimes)"""
+    profile = get_profile(section, nb_section)
+    s = profile.get_section(profile.get_nb_section()//2)
+    yc = s.get_yc(Q)
+    Hs_list = [s.get_Hs(Q, yc)*(1.05 + 0.5*k/nb_call) for k in range(nb_call)]
+    def solve():
+        for Hs in Hs_list:
+            s.get_y_from_Hs(Q, Hs, True, yc=yc)
+            s.get_y_from_Hs(Q, Hs, False, yc=yc)
+    duration, peak, _ = measure(solve)
+    return duration/(2*nb_call), peak, None
+
+def bench_update_bottom(section, nb_section, law_name):
+    profile = build_profile(section, nb_section)
+    law = build_transport_law(law_name)
+    y_list = profile.compute_depth(Q)
+    z_list = profile.get_z_list()
+    duration, peak, _ = measure(lambda: profile.update_bottom(Q, y_list, 0.01, 0.1, law), setup=lambda: profile.set_z_list(z_list))
+    return duration, peak, None
+
+def bench_event(section, nb_section, law_name):
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        duration, peak, nb_step = executor.submit(run_event, section, nb_section, law_name).result()
+    return duration, peak, nb_step/duration
+
+def run_event(section, nb_section, law_name):
+    """compute one event (in the process running the benchmark) and return its time, its memory growth (bytes) and its steps"""
+    hydrogram, t = build_hydrogram()
+    law = build_transport_law(law_name)
+    profile = build_profile(section, nb_section)
+    import scipy.optimize # imported by the root finders at their first fallback, not part of the event memory
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with contextlib.redirect_stdout(io.StringIO()):
+        t0 = perf_counter()
+        result = profile.compute_event(hydrogram, t, law, friction_law="Ferguson")
+        duration = perf_counter()-t0
+    peak = 1024*(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss) # ru_maxrss is given in kB
+    return duration, peak, len(result["water_depth"]) - 1
+
+def run(size_list=SIZE_LIST, filter_text=None):
+    """return the rows of the suite : [case, time (s), peak memory (bytes), steps/s (events only, None else)]"""
+    job_list = [] # (case, bench function returning (time, peak memory, steps/s), arguments)
+    for section in SECTION_LIST:
+        for nb_section in size_list:
+            job_list.append((f"compute_depth/{section}/{nb_section}", bench_compute_depth, (section, nb_section)))
+            job_list.append((f"find_best_dt/{section}/{nb_section}", bench_find_best_dt, (section, nb_section)))
+            job_list.append((f"complete/{section}/{nb_section}", bench_complete, (section, nb_section)))
+            if nb_section == SIZE_LIST[0]:
+                job_list.append((f"get_y_from_Hs/{section}", bench_get_y_from_Hs, (section, nb_section)))
+    for section in SECTION_LIST[:1]: # update_bottom is not implemented for trapezoidal and irregular sections
+        for law_name in TRANSPORT_LAW_DICT:
+            job_list.append((f"update_bottom/{section}/{LAW_SIZE}/{law_name}", bench_update_bottom, (section, LAW_SIZE, law_name)))
+            job_list.append((f"event/{section}/{LAW_SIZE}/{law_name}", bench_event, (section, LAW_SIZE, law_name)))
+        for nb_section in size_list:
+            if nb_section != LAW_SIZE:
+                job_list.append((f"event/{section}/{nb_section}/{DEFAULT_LAW}", bench_event, (section, nb_section, DEFAULT_LAW)))
+    row_list = []
+    for name, bench, args in job_list:
+        if filter_text is not None and not(set(filter_text.split("/")) <= set(name.split("/"))):
+            continue
+        row_list.append([name, *bench(*args)])
+    return row_list
+
+def get_machine():
+    import scipy
+    return {"platform": platform.platform(), "processor": platform.processor() or platform.machine(), "python": platform.python_version(), "numpy": np.__version__, "scipy": scipy.__version__}
+
+def save_baseline(name, row_list):
+    os.makedirs(BASELINE_FOLDER, exist_ok=True)
+    path = os.path.join(BASELINE_FOLDER, f"{name}.json")
+    data = {"machine": get_machine(), "cases": {case: {"time": duration, "peak": peak, "steps_per_s": speed} for case, duration, peak, speed in row_list}}
+    with open(path, "w") as f:
+        json.dump(data, f, indent=4)
+    print(f"baseline saved in {path}")
+
+def compare(name, row_list, threshold=0.1):
+    """print the comparison of row_list with the baseline name and return the number of cases slower by more than threshold"""
+    from prettytable import PrettyTable
+    path = os.path.join(BASELINE_FOLDER, f"{name}.json")
+    if not(os.path.isfile(path)):
+        print(f"ERROR : no baseline called {name} ({path})")
+        return 0
+    baseline = json.load(open(path, "r"))
+    if baseline["machine"] != get_machine():
+        print(f"WARNING : the baseline {name} has been measured on another machine or environment : {baseline['machine']}")
+    table = PrettyTable(["case", "baseline (ms)", "current (ms)", "speedup", "baseline peak (kB)", "current peak (kB)", "status"])
+    nb_slower = 0
+    for case, duration, peak, _ in row_list:
+        reference = baseline["cases"].get(case)
+        if reference is None:
+            table.add_row([case, "-", f"{1e3*duration:.3f}", "-", "-", f"{peak/1e3:.1f}", "new"])
+            continue
+        ratio = reference["time"]/duration
+        if ratio < 1/(1+threshold):
+            status = "SLOWER"
+            nb_slower += 1
+        elif ratio > 1+threshold:
+            status = "faster"
+        else:
+            status = "="
+        table.add_row([case, f"{1e3*reference['time']:.3f}", f"{1e3*duration:.3f}", f"{ratio:.2f}x", f"{reference['peak']/1e3:.1f}", f"{peak/1e3:.1f}", status])
+    print(f"comparison with the baseline {name} (threshold {100*threshold:.0f}%) :")
+    print(table)
+    print(f"{nb_slower} case(s) slower than the baseline")
+    return nb_slower
+
+if __name__ == "__main__":
+    from prettytable import PrettyTable
+    parser = argparse.ArgumentParser(description="benchmark suite of the solver")
+    parser.add_argument("--quick", action="store_true", help="skip the 10000 sections profiles")
+    parser.add_argument("--filter", help="only run the cases whose name has every part of this text (event/1000, rectangular...)")
+    parser.add_argument("--save", help="store the results as the baseline NAME")
+    parser.add_argument("--compare", help="compare the results with the baseline NAME")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown reported as a regression (default 0.1)")
+    args = parser.parse_args()
+    row_list = run(SIZE_LIST[:-1] if args.quick else SIZE_LIST, filter_text=args.filter)
+    table = PrettyTable(["case", "time (ms)", "peak memory (kB)", "steps/s"])
+    for case, duration, peak, speed in row_list:
+        table.add_row([case, f"{1e3*duration:.3f}", f"{peak/1e3:.1f}", "-" if speed is None else f"{speed:.1f}"])
+    print(table)
+    if args.save:
+        save_baseline(args.save, row_list)
+    if args.compare and compare(args.compare, row_list, threshold=args.threshold) > 0:
+        sys.exit(1)
@@ -7,8 +7,9 @@ import os
 import shutil
 import datetime
 import json
-from src.run import run_back
 from src.utils import parse_datafile, input_float, input_int, check_answer
+# the computation modules (src.run, src.ensemble, src.resultFile, src.render) are imported by the commands which use them,
+# so that project management commands (-l, -d, -c, ...) start fast
 
 
 def main():
@@ -21,8 +22,14 @@ def main():
     parser.add_argument("-c", "--copy", nargs="?", help="copy a given project")
     parser.add_argument("-m", "--modify", nargs='?', help="modify a given project")
     parser.add_argument("-r", "--run", nargs='?', help="run a given project")
+    parser.add_argument("--resume", action="store_true", help="with -r, restart the run from its last checkpoint")
     parser.add_argument("--clear", action="store_true", help="remove all the existing log files")
     parser.add_argument("--hydrau", nargs='?', help="hydraulic computation for a given water discharge")
+    parser.add_argument("--export", nargs='?', help="export a result file (results.npz) in text files, next to it")
+    parser.add_argument("--render", nargs='?', help="plot a result file (results.npz) : result.png and animation.mp4 (png frames if ffmpeg is not installed), next to it")
+    parser.add_argument("--frames", type=int, default=300, help="with --render, number of frames of the animation")
+    parser.add_argument("--no-plot", action="store_true", help="headless mode : matplotlib is never imported (with --hydrau, water depths are written in hydrau.txt)")
+    parser.add_argument("--ensemble", nargs='?', help="run a parameter sweep described by a json file : {\"PROJECT\": name, \"GRID\": {KEY: [values]}, \"MAX_WORKERS\": n}")
     args = parser.parse_args()
 
     ### CLEAR LOG ###
@@ -60,11 +67,26 @@ def main():
     
     ### RUN ###
     if args.run:
-        run(args.run)
+        run(args.run, resume=args.resume, plot=not(args.no_plot))
 
     ### HYDRAU ###
     if args.hydrau:
-        run(args.hydrau, hydrau=True)
+        run(args.hydrau, hydrau=True, plot=not(args.no_plot))
+
+    ### EXPORT ###
+    if args.export:
+        export(args.export)
+
+    ### RENDER ###
+    if args.render:
+        if args.no_plot:
+            print("ERROR : --render can not be used with --no-plot")
+        else:
+            render(args.render, nb_frame=args.frames)
+
+    ### ENSEMBLE ###
+    if args.ensemble:
+        ensemble(args.ensemble)
 
     return
 
@@ -372,10 +394,13 @@ def quickstart():
     print(f"[QS] please now fill the following data files : {data_files} \n note that you can use -m option to change quickly some configuration data.")
     return
 
-def run(project_name, hydrau=False):
+def run(project_name, hydrau=False, resume=False, plot=True):
     """
     run a given project called project_name. If hydrau==True, it will only compute water depth and not the entire simulation.
+    If resume==True, the simulation restarts from the last checkpoint of the project.
+    If plot==False, nothing is plotted and matplotlib is not imported (see run_back).
     """
+    from src.run import run_back
     try:
         os.chdir("./projects")
     except FileNotFoundError:
@@ -398,11 +423,65 @@ def run(project_name, hydrau=False):
         return
     water_discharge = input_float("choose a water discharge (m3/s) [float expected] : ") if hydrau else None
 
-    run_back(args_dict, hydrau=water_discharge)
+    run_back(args_dict, hydrau=water_discharge, resume=resume, plot=plot)
     
     return
 
 
+def export(result_path):
+    """
+    export a result file (see src/resultFile.py) in text files, in a txt_files folder next to it
+    """
+    if not(os.path.isfile(result_path)):
+        print(f"ERROR : {result_path} does not exist")
+        return
+    from src.resultFile import ResultFile
+    ResultFile.export_text(result_path)
+    print(f"results exported in {os.path.join(os.path.dirname(result_path), 'txt_files')}")
+    return
+
+def render(result_path, nb_frame=300):
+    """
+    plot a result file (see src/render.py) : result.png and animation.mp4 are written next to it
+    """
+    if not(os.path.isfile(result_path)):
+        print(f"ERROR : {result_path} does not exist")
+        return
+    from src.render import Render
+    Render.render(result_path, nb_frame=nb_frame)
+    return
+
+def ensemble(sweep_path):
+    """
+    run every combination of the parameter grid given in the sweep file (see src/ensemble.py), for example :
+    {"PROJECT": "my_project", "GRID": {"QM": [10, 20], "TRANSPORT_LAW": ["Lefort2015", "Rickenmann1991"]}, "MAX_WORKERS": 4}
+    The results are written in ./projects/PROJECT/results/ensemble_DATE
+    """
+    try:
+        sweep = json.load(open(sweep_path, 'r'))
+    except FileNotFoundError:
+        print(f"ERROR : {sweep_path} does not exist")
+        return
+    try:
+        project_name = sweep["PROJECT"]
+        grid = sweep["GRID"]
+    except KeyError:
+        print("ERROR : the sweep file must give a PROJECT name and a GRID of values")
+        return
+    try:
+        os.chdir(os.path.join("./projects", project_name))
+    except FileNotFoundError:
+        print(f"there is no project called {project_name}.")
+        return
+    try:
+        args_dict = json.load(open(f"{project_name}_conf.json", 'r'))
+    except FileNotFoundError:
+        print(f"ERROR : no conf file found. Please be sure that your conf file name is '{project_name}_conf.json'")
+        return
+    from src.ensemble import run_ensemble
+    run_ensemble(args_dict, grid, max_workers=sweep.get("MAX_WORKERS"))
+    return
+
 
 if __name__=='__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,28 @@
+import os
+import numpy as np
+
+class Checkpoint:
+    """
+    Compact checkpoint of an event computation (see Profile.compute_event) : a .npz file of arrays and numbers only.
+    It is written in a temporary file renamed at the end, so a crash while saving never corrupts the previous checkpoint.
+    """
+
+    @staticmethod
+    def save(path, **data):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path):
+        """return the dict of saved values (numbers are returned as python numbers)"""
+        with np.load(path) as data:
+            return {key: (data[key].item() if data[key].ndim == 0 else data[key]) for key in data.files}
+
+    @staticmethod
+    def remove(path):
+        if os.path.isfile(path):
+            os.remove(path)
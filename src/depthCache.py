@@ -0,0 +1,73 @@
+import weakref
+from collections import OrderedDict
+from src.perf import Performance
+
+class DepthCache:
+    """
+    Bounded LRU cache of root-finding results (critical and normal depths) used with the decorator @DepthCache.memoize.
+    Entries are keyed on the identity of the section, the water discharge quantized with Q_quantum and a state key given by the
+    decorated method (geometry, bed slope...). Sections are not kept alive by the cache : the entries of a section are removed when
+    it is garbage collected (discarded profiles, copies...). Hits and misses are counted by Performance when performances are measured.
+    Entries are only reused for the same discharge (Q_quantum only absorbs rounding errors, a cached depth is never used for another
+    discharge), e.g. repeated compute_depth at the same Q (refinement, plots, steady computations). During an event Q changes on
+    every step, so Profile.compute_event disables the cache (enabled=False), which then costs nothing.
+    """
+    cache = OrderedDict()
+    max_size = 100000
+    Q_quantum = 1e-9 # m3/s, discharges closer than this (rounding errors) share the same entries
+    enabled = True
+    __section_keys = dict() # id of a section -> keys of its entries
+
+    @staticmethod
+    def clear():
+        DepthCache.cache.clear()
+        for key_set in DepthCache.__section_keys.values():
+            key_set.clear()
+
+    @staticmethod
+    def memoize(name, key_function):
+        """
+        decorator for a section method f(section, Q, *args, **kargs). key_function(section, *args, **kargs) must return
+        everything (except Q) the result depends on and that can change during the life of the section.
+        """
+        def decorator(func):
+            def wrapper(section, Q, *args, **kargs):
+                if not(DepthCache.enabled):
+                    return func(section, Q, *args, **kargs)
+                key = (name, id(section), round(Q/DepthCache.Q_quantum), key_function(section, *args, **kargs))
+                cache = DepthCache.cache
+                try:
+                    result = cache[key]
+                    cache.move_to_end(key)
+                    Performance.count(name, hit=True)
+                    return result
+                except KeyError:
+                    pass
+                result = func(section, Q, *args, **kargs)
+                DepthCache.__add(section, key, result)
+                Performance.count(name, hit=False)
+                return result
+            wrapper.__name__ = func.__name__
+            wrapper.__doc__ = func.__doc__
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def __add(section, key, result):
+        cache = DepthCache.cache
+        key_set = DepthCache.__section_keys.get(key[1])
+        if key_set is None:
+            key_set = DepthCache.__section_keys[key[1]] = set()
+            weakref.finalize(section, DepthCache.__remove_section, key[1])
+        cache[key] = result
+        key_set.add(key)
+        if len(cache) > DepthCache.max_size:
+            old_key, _ = cache.popitem(last=False)
+            DepthCache.__section_keys[old_key[1]].discard(old_key)
+
+    @staticmethod
+    def __remove_section(section_id):
+        """called when a section is garbage collected"""
+        cache = DepthCache.cache
+        for key in DepthCache.__section_keys.pop(section_id, ()):
+            cache.pop(key, None)
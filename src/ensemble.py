@@ -0,0 +1,126 @@
+import itertools
+import json
+import os
+import datetime as dt
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.run import build_granulometry_list, build_profile, build_telemetry, build_writer, run_event, save_result
+
+PROFILE_KEYS = ("SECTION", "PROFILE_PATH", "GRANULOMETRY_FILES", "INTERPOLATION", "DX") # configuration values the profile depends on
+ADAPTIVE_PROFILE_KEYS = ("NB_SECTION", "REFINEMENT_RATIO", "LAVABRE", "QM", "QB", "TM", "ALPHA", "DURATION", "DT", "HYDROGRAM_PATH", "CRITICAL", "FRICTION_LAW", "UPSTREAM_CONDITION", "DOWNSTREAM_CONDITION") # and with adaptive refinement
+SUMMARY_FIELDS = ("status", "V_in", "V_out", "stored", "dz_min", "dz_max", "h_max", "nb_step", "time")
+
+_base_profile_dict = dict() # base profiles of a worker process, see init_worker
+
+def run_ensemble(base_args, grid, max_workers=None, folder=None):
+    """
+    Run one event for each combination of the parameter grid on a pool of processes.
+    base_args is a project configuration (see the *_conf.json files), grid is a dict {KEY: [value_1, value_2, ...]}
+    of configuration values to sweep (QM, TM, ALPHA, TRANSPORT_LAW, GRANULOMETRY_FILES...).
+    Profiles are built once in this process (once per different profile configuration), each worker receives them at its start
+    and computes every run on its own copy. Each result is written in its own folder and a summary table is written at the end.
+    It returns the list of summary rows.
+    """
+    for key in grid:
+        if not(key in base_args):
+            print(f"WARNING : {key} is not a key of the base configuration")
+    scenario_list = get_scenario_list(base_args, grid)
+    profile_dict = dict()
+    for args in scenario_list:
+        key = get_profile_key(args)
+        if not(key in profile_dict):
+            profile = build_profile(args, build_granulometry_list(args))
+            if profile is None:
+                print("ERROR : ensemble aborted while building profile")
+                return None
+            profile_dict[key] = profile
+    if folder is None:
+        e = dt.datetime.now()
+        folder = os.path.join("./results", f"ensemble_{e.year}_{e.month}_{e.day}_{e.hour}_{e.minute}_{e.second}")
+    os.makedirs(folder, exist_ok=True)
+    print(f"ensemble of {len(scenario_list)} runs ({len(profile_dict)} different profiles), results in {folder}")
+
+    row_list = [None for _ in scenario_list]
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker, initargs=(profile_dict,)) as executor:
+        future_dict = dict()
+        for i, args in enumerate(scenario_list):
+            future_dict[executor.submit(run_scenario, args, os.path.join(folder, f"run_{i}"))] = i
+        for future in as_completed(future_dict):
+            i = future_dict[future]
+            try:
+                summary = future.result()
+            except Exception as error:
+                print(f"ERROR : run_{i} failed ({error})")
+                summary = {"status": "error"}
+            row = {"run": f"run_{i}"}
+            row.update({key: scenario_list[i][key] for key in grid})
+            row.update(summary)
+            row_list[i] = row
+            print(f"run_{i} done ({len([r for r in row_list if r is not None])}/{len(scenario_list)})")
+
+    table = get_summary_table(row_list, list(grid))
+    print(table)
+    with open(os.path.join(folder, "summary.txt"), 'w') as f:
+        f.write(table.get_string())
+    with open(os.path.join(folder, "summary.csv"), 'w') as f:
+        f.write(table.get_csv_string())
+    json.dump({"BASE": base_args, "GRID": grid}, open(os.path.join(folder, "ensemble_reminder.json"), 'w'), indent=6)
+    return row_list
+
+def get_scenario_list(base_args, grid):
+    """list of configurations : one for each combination of the grid values (in the order of the grid keys)"""
+    key_list = list(grid)
+    scenario_list = []
+    for value_list in itertools.product(*[grid[key] for key in key_list]):
+        args = dict(base_args)
+        args.update(zip(key_list, value_list))
+        scenario_list.append(args)
+    return scenario_list
+
+def get_profile_key(args):
+    key_list = list(PROFILE_KEYS)
+    if args["INTERPOLATION"] and args.get("NB_SECTION") != None:
+        key_list += ADAPTIVE_PROFILE_KEYS
+    return json.dumps([args.get(key) for key in key_list])
+
+def init_worker(profile_dict):
+    """called once at the start of each worker process"""
+    _base_profile_dict.update(profile_dict)
+
+def run_scenario(args, folder):
+    """compute one run of the ensemble on a copy of its base profile, save it in folder and return its summary"""
+    profile = _base_profile_dict[get_profile_key(args)].copy(share_geometry=True)
+    os.makedirs(folder, exist_ok=True)
+    writer = build_writer(args, folder)
+    result = run_event(args, profile, writer=writer, telemetry=build_telemetry(args, folder))
+    if result is None:
+        return {"status": "invalid"}
+    save_result(args, result, folder, streamed=(writer is not None))
+    return get_summary(result)
+
+def get_summary(result):
+    envelope = result["envelope"]
+    dz = envelope.get_dz()
+    return {
+        "status": "ok",
+        "V_in": result["volume_in"],
+        "V_out": result["volume_out"],
+        "stored": result["stored_volume"],
+        "dz_min": float(np.min(dz)),
+        "dz_max": float(np.max(dz)),
+        "h_max": float(np.max(envelope.get_max("y"))),
+        "nb_step": envelope.get_nb_row(),
+        "time": result["computation_time"]
+    }
+
+def get_summary_table(row_list, key_list):
+    from prettytable import PrettyTable
+    table = PrettyTable()
+    table.field_names = ["run"] + key_list + list(SUMMARY_FIELDS)
+    for row in row_list:
+        table.add_row([row["run"]] + [row[key] for key in key_list] + [_format(row.get(field, "")) for field in SUMMARY_FIELDS])
+    return table
+
+def _format(value):
+    return f"{value:.4g}" if isinstance(value, float) else value
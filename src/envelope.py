@@ -0,0 +1,95 @@
+import numpy as np
+
+FIELD_LIST = ("y", "z", "H") # water depth, bottom height, head
+
+class Envelope:
+    """
+    Statistics of an event for each section : maximum (and time of the maximum), minimum and mean of water depth, bottom height
+    and head, and the bottom evolution (final - initial). It is updated online, step by step (see Profile.compute_event),
+    so no matrix is needed, or computed at once from result matrices (see from_matrices).
+    """
+
+    def __init__(self, nb_section):
+        self.__nb_row = 0
+        self.__max = {name: np.full(nb_section, -np.inf) for name in FIELD_LIST}
+        self.__t_max = {name: np.full(nb_section, np.nan) for name in FIELD_LIST}
+        self.__min = {name: np.full(nb_section, np.inf) for name in FIELD_LIST}
+        self.__sum = {name: np.zeros(nb_section) for name in FIELD_LIST}
+        self.__z_start = np.full(nb_section, np.nan)
+        self.__z_end = np.full(nb_section, np.nan)
+
+    def update(self, t, y, z, H):
+        """add the state of the profile at time t"""
+        for name, value in zip(FIELD_LIST, (y, z, H)):
+            value = np.asarray(value, dtype=np.float64)
+            greater = value > self.__max[name] # strict : the time of the first maximum is kept
+            self.__max[name][greater] = value[greater]
+            self.__t_max[name][greater] = t
+            np.minimum(self.__min[name], value, out=self.__min[name])
+            self.__sum[name] += value
+        if self.__nb_row == 0:
+            self.__z_start[:] = z
+        self.__z_end[:] = z
+        self.__nb_row += 1
+
+    @staticmethod
+    def from_matrices(t_list, y_matrix, z_matrix, h_matrix):
+        """envelope of result matrices (one row per time of t_list, rows in excess are ignored)"""
+        t = np.asarray(t_list, dtype=np.float64)
+        matrix_list = [np.asarray(matrix, dtype=np.float64) for matrix in (y_matrix, z_matrix, h_matrix)]
+        nb_row = min([len(t)] + [len(matrix) for matrix in matrix_list])
+        envelope = Envelope(matrix_list[1].shape[1])
+        if nb_row == 0:
+            return envelope
+        for name, matrix in zip(FIELD_LIST, matrix_list):
+            matrix = matrix[:nb_row]
+            envelope.__max[name] = np.max(matrix, axis=0)
+            envelope.__t_max[name] = t[np.argmax(matrix, axis=0)]
+            envelope.__min[name] = np.min(matrix, axis=0)
+            envelope.__sum[name] = np.sum(matrix, axis=0)
+        envelope.__z_start = matrix_list[1][0].copy()
+        envelope.__z_end = matrix_list[1][nb_row-1].copy()
+        envelope.__nb_row = nb_row
+        return envelope
+
+    def get_checkpoint(self):
+        """state of the envelope, to be saved in a checkpoint (see restore)"""
+        checkpoint = {"envelope_nb_row": self.__nb_row, "envelope_z_start": self.__z_start, "envelope_z_end": self.__z_end}
+        for name in FIELD_LIST:
+            checkpoint[f"envelope_max_{name}"] = self.__max[name]
+            checkpoint[f"envelope_t_max_{name}"] = self.__t_max[name]
+            checkpoint[f"envelope_min_{name}"] = self.__min[name]
+            checkpoint[f"envelope_sum_{name}"] = self.__sum[name]
+        return checkpoint
+
+    def restore(self, checkpoint):
+        self.__nb_row = checkpoint["envelope_nb_row"]
+        self.__z_start = np.array(checkpoint["envelope_z_start"], dtype=np.float64)
+        self.__z_end = np.array(checkpoint["envelope_z_end"], dtype=np.float64)
+        for name in FIELD_LIST:
+            self.__max[name] = np.array(checkpoint[f"envelope_max_{name}"], dtype=np.float64)
+            self.__t_max[name] = np.array(checkpoint[f"envelope_t_max_{name}"], dtype=np.float64)
+            self.__min[name] = np.array(checkpoint[f"envelope_min_{name}"], dtype=np.float64)
+            self.__sum[name] = np.array(checkpoint[f"envelope_sum_{name}"], dtype=np.float64)
+
+    # getters (name is one of "y", "z", "H")
+
+    def get_nb_row(self):
+        return self.__nb_row
+
+    def get_max(self, name):
+        return self.__max[name]
+
+    def get_t_max(self, name):
+        return self.__t_max[name]
+
+    def get_min(self, name):
+        return self.__min[name]
+
+    def get_mean(self, name):
+        """mean over the rows (not weighted by the time steps)"""
+        return self.__sum[name] / self.__nb_row
+
+    def get_dz(self):
+        """bottom evolution during the event (final - initial)"""
+        return self.__z_end - self.__z_start
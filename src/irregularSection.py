@@ -1,34 +1,57 @@
-import matplotlib.pyplot as plt
 import numpy as np
 
+from bisect import bisect_right
 from copy import copy
-from scipy.misc import derivative
-from scipy.optimize import brentq, newton
+from src.depthCache import DepthCache
 from src.perf import Performance
+from src.telemetry import Telemetry
 from src.utils import G, Y_MIN, get_centroid
 
+_slot_name_dict = dict() # class : names of the slots of its instances, see IrregularSection.get_slot_names
+
 class IrregularSection:
+    """
+    Cross section described by a list of points. Sections store their attributes in slots (no instance dict) :
+    a profile can have a lot of sections. Prismatic sections (see RectangularSection, TrapezoidalSection) do not store
+    any point, they are built from their parameters only when needed (see build_points).
+    """
+
+    __slots__ = ("__use_geometry_table", "__geometry_version", "__initialPoints", "__points", "__x_list", "__y_list", "__y_max", "__geometry_table",
+                 "__index_min", "__x_min", "__y_min", "__x", "__z", "__z_min", "__up_section", "__is_upstream", "__down_section", "__is_downstream",
+                 "__granulometry", "__manning", "__tauc_over_rho", "__K_over_tauc", "__state", "__index", "__weakref__") # __weakref__ : see DepthCache
 
-    def __init__(self, points, x, z, z_min=None, up_section=None, down_section=None, granulometry=None, manning=None, tauc_over_rho=None, K_over_tauc=None):
+    def __init__(self, points, x, z, z_min=None, up_section=None, down_section=None, granulometry=None, manning=None, tauc_over_rho=None, K_over_tauc=None, geometry_table=True):
         """
         Constructor and initializations
         Args :
-            points (list of tuples) : points which describe the cross section (for example [(0, 10), (1, 0), (10, 0), (10, 10)])
+            points (list of tuples) : points which describe the cross section (for example [(0, 10), (1, 0), (10, 0), (10, 10)]),
+                None for prismatic sections (see build_points)
             z (float) : total height of the lowest point of the section
             z_min (float) : height minimal of the lowest point of the section
+            geometry_table (bool) : if True, geometrical quantities (b, S, P, R, centroid) are read in a table built once from the points (see get_geometry_table)
         """
 
         # initializations
-        if len(points) < 3:
-            raise(ValueError("Error : you need at least 3 points to describe a section."))
-        self.__initialPoints = copy(points)                             # points of original section are saved in this hidden variable
-        self.__points = copy(points)                                    # import of points of cross section
-        self.setup_points()                                             # initialize self.__x_list, self.__y_list and setup self.__points to verify some conditions (more details in the methods)
-        self.__index_min = self.__y_list.index(min(self.__y_list))      # index of the lowest point of the section
-        self.__x_min = self.__x_list[self.__index_min]
-        self.__y_min = self.__y_list[self.__index_min]
+        self.__use_geometry_table = geometry_table
+        self.__geometry_version = 0
+        self.__geometry_table = None
+        if points == None: # prismatic section, points are not stored
+            self.__initialPoints = self.__points = self.__x_list = self.__y_list = None
+            self.__index_min = self.__x_min = self.__y_min = None
+            self.__y_max = self.get_y_max()
+        else:
+            if len(points) < 3:
+                raise(ValueError("Error : you need at least 3 points to describe a section."))
+            self.__initialPoints = copy(points)                             # points of original section are saved in this hidden variable
+            self.__points = copy(points)                                    # import of points of cross section
+            self.setup_points()                                             # initialize self.__x_list, self.__y_list and setup self.__points to verify some conditions (more details in the methods)
+            self.__index_min = self.__y_list.index(min(self.__y_list))      # index of the lowest point of the section
+            self.__x_min = self.__x_list[self.__index_min]
+            self.__y_min = self.__y_list[self.__index_min]
         self.__x = x                                                    # abscissa of the section
         self.__z = z
+        self.__state = None # state of the profile holding the elevation, see set_state
+        self.__index = None
         if z_min==None or z_min>z:
             self.__z_min = z
         else:
@@ -71,12 +94,24 @@ class IrregularSection:
 
         it also updates the attributes self.__x_list and self.__y_list
         """
+        if self.__points == None:
+            return # prismatic section
+        self.__points = sorted(self.__points, key = lambda p : p[0]) # (1) a new list : light copies may share the previous one
+        x, y = IrregularSection.get_point_lists(self.__points)
+        self.__x_list = x
+        self.__y_list = y
+        self.__y_max = max(y)
+        self.__geometry_table = None # points changed, the table will be built again when needed
+        self.__geometry_version += 1
+        return
 
-        self.__points.sort(key = lambda p : p[0]) # (1)
+    @staticmethod
+    def get_point_lists(points):
+        """lists x, y of the points (sorted by x increasing) satisfying the conditions (2), (3), (4) of setup_points"""
         # (2)
-        x = [p[0] for p in self.__points]
+        x = [p[0] for p in points]
         x = list(np.array(x)-x[0])
-        y = [p[1] for p in self.__points]
+        y = [p[1] for p in points]
         y = list(np.array(y)-min(y))
 
         # (3)
@@ -94,11 +129,19 @@ class IrregularSection:
         if y[-1] < max(y):
             y.append(max(y))
             x.append(x[-1])
-        
-        self.__x_list = x
-        self.__y_list = y
-        self.__y_max = max(y)
-        return
+        return x, y
+
+    def build_points(self):
+        """points of a prismatic section, built from its parameters"""
+        raise(NotImplementedError("build_points on a non prismatic section."))
+
+    def __get_geometry(self):
+        """points, x_list, y_list and index of the lowest point : stored for irregular sections, built for prismatic ones"""
+        if self.__points != None:
+            return self.__points, self.__x_list, self.__y_list, self.__index_min
+        points = sorted(self.build_points(), key=lambda p: p[0])
+        x, y = IrregularSection.get_point_lists(points)
+        return points, x, y, y.index(min(y))
 
     def interp_as_up_section(self, other_section, x=None):
         interpolated_section = IrregularSection.interp(self, other_section, x=x)
@@ -108,9 +151,86 @@ class IrregularSection:
         interpolated_section = IrregularSection.interp(other_section, self, x=x)
         return interpolated_section
 
+    def interp_list_as_up_section(self, other_section, x_list):
+        """
+        interp_as_up_section for every abscissa of x_list at once (see Profile.complete). The first section is interpolated as usual,
+        the other ones are shallow copies of it with their own x, z, z_min : they share its geometry (points, geometry table),
+        which is never modified in place.
+        """
+        if len(x_list) == 0:
+            return []
+        template = self.interp_as_up_section(other_section, x_list[0])
+        if template.__use_geometry_table and not(template.is_prismatic()):
+            template.get_geometry_table() # built once for every copy
+        xp = [self.__x, other_section.__x]
+        z_array = np.interp(x_list, xp, [self.get_z(), other_section.get_z()])
+        z_min_array = np.interp(x_list, xp, [self.__z_min, other_section.__z_min])
+        section_list = [template]
+        for x, z, z_min in zip(x_list[1:], z_array[1:], z_min_array[1:]):
+            section = template.light_copy()
+            section.__x = x
+            section.__z = z
+            section.__z_min = z_min
+            section_list.append(section)
+        return section_list
+
     def copy(self):
         """return a safe copy of this section"""
-        return IrregularSection(self.__points[:], self.get_x(), self.get_z(), z_min=self.get_z_min(), up_section=self.get_up_section(), down_section=self.get_down_section(), granulometry=self.get_granulometry(), manning=self.get_manning(), K_over_tauc=self.get_K_over_tauc(), tauc_over_rho=self.get_tauc_over_rho())
+        return IrregularSection(self.__points[:], self.get_x(), self.get_z(), z_min=self.get_z_min(), up_section=self.get_up_section(), down_section=self.get_down_section(), granulometry=self.get_granulometry(), manning=self.get_manning(), K_over_tauc=self.get_K_over_tauc(), tauc_over_rho=self.get_tauc_over_rho(), geometry_table=self.__use_geometry_table)
+
+    def light_copy(self):
+        """
+        return a copy of this section sharing its geometry (points, geometry table, granulometry) : nothing is built again.
+        It is safe because the shared objects are never modified in place : setup_points builds a new point list and table,
+        set_b replaces a number, so the geometry is shared until one of the sections changes it. Links to the neighbour sections and to the state holding the elevation must be set again (see Profile.setup_section_list).
+        """
+        section = object.__new__(type(self))
+        for name in self.get_slot_names():
+            setattr(section, name, getattr(self, name))
+        section.__z = self.get_z()
+        section.__state = section.__index = None
+        section.__up_section = section
+        section.__down_section = section
+        return section
+
+    def get_slot_names(self):
+        """names of the slots of this section (names of private attributes are mangled)"""
+        cls = type(self)
+        if not(cls in _slot_name_dict):
+            name_list = []
+            for c in cls.__mro__:
+                for name in c.__dict__.get("__slots__", ()):
+                    if name == "__weakref__":
+                        continue
+                    name_list.append(f"_{c.__name__.lstrip('_')}{name}" if name.startswith("__") else name)
+            _slot_name_dict[cls] = name_list
+        return _slot_name_dict[cls]
+
+    def __getstate__(self):
+        """
+        links to the neighbour sections are not pickled : pickling a long chain of linked sections exceeds the recursion limit.
+        Profile.__setstate__ links them again.
+        """
+        state = {name: getattr(self, name) for name in self.get_slot_names()}
+        state["_IrregularSection__z"] = self.get_z()
+        state["_IrregularSection__state"] = state["_IrregularSection__index"] = None
+        state["_IrregularSection__up_section"] = None
+        state["_IrregularSection__down_section"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__use_geometry_table = True # slots missing in profiles exported by older versions
+        self.__geometry_version = 0
+        self.__geometry_table = None
+        self.__state = self.__index = None
+        for name, value in state.items():
+            if hasattr(type(self), name): # profiles exported by older versions may have other attributes
+                setattr(self, name, value)
+        if self.is_prismatic(): # older versions stored the points of prismatic sections, they are now built when needed
+            self.__initialPoints = self.__points = self.__x_list = self.__y_list = None
+            self.__index_min = self.__x_min = self.__y_min = None
+        self.__up_section = self
+        self.__down_section = self
 
     def get_stored_volume(self):  
         print("get_stored_volume not defined yet for an irregular section. Return 0.")
@@ -124,16 +244,16 @@ class IrregularSection:
         Returns :
             wet_points (list of tuples) : list of points that describe wet section
         """
-        points = self.__points    
+        points, _, y_list, index_min = self.__get_geometry()
         if y >= self.get_y_max():
             print(f"WARNING : Water depth has gone upper than the maximum one ({y}>{self.__y_max}m)")
             return points        
         # Look for the left point of intersection
-        index=self.__index_min
+        index=index_min
         left=True
         while left:
             index+=-1
-            if self.__y_list[index] >= y:
+            if y_list[index] >= y:
                 left = False
                 x1,y1 = points[index+1]
                 x2,y2 = points[index]
@@ -141,30 +261,84 @@ class IrregularSection:
                 index_left=index
                 
         # Look for the right point of intersection
-        index=self.__index_min
+        index=index_min
         right=True
         while right:
             index+=1
-            if self.__y_list[index] > y:
+            if y_list[index] > y:
                 right = False
                 x1,y1 = points[index-1]
                 x2,y2 = points[index]
                 x_right = (y - y1) * (x2 - x1) / (y2 - y1) + x1
                 index_right=index
             
-        wet_points=[(x_left, y)] + self.__points[index_left+1:index_right] + [(x_right, y)]        
+        wet_points=[(x_left, y)] + points[index_left+1:index_right] + [(x_right, y)]        
         return wet_points
 
+    def get_geometry_table(self):
+        """
+        Table of the wet section geometry as a function of the water depth, built once from the points.
+        Between two consecutive heights of points (levels), the wet section is bounded by the same two segments :
+        the width b and the wet perimeter P are linear, the wet surface S is quadratic (dS/dy = b) and the wet points are the same
+        except the two limits, so the mean height of the wet points (centroid used in get_Fs) is linear too.
+        For each interval [levels[k], levels[k+1]] the table stores b, S, P at levels[k], the slopes of b and P,
+        the number and the sum of heights of the inner wet points. Every quantity is then exact and costs a binary search.
+        """
+        if self.__geometry_table == None:
+            levels = sorted(set(self.__get_geometry()[2]))
+            b_list, db_list, S_list, P_list, dP_list, n_list, sum_list = [], [], [], [], [], [], []
+            for k in range(len(levels)-1):
+                y_k = levels[k]
+                y1 = y_k + (levels[k+1]-y_k)/3
+                y2 = y_k + 2*(levels[k+1]-y_k)/3
+                wet_points_1 = self.get_wet_section(y1)
+                wet_points_2 = self.get_wet_section(y2)
+                b1 = IrregularSection.get_b(self, y1, wet_points_1)
+                db = (IrregularSection.get_b(self, y2, wet_points_2)-b1)/(y2-y1)
+                P1 = IrregularSection.get_P(self, y1, wet_points_1)
+                dP = (IrregularSection.get_P(self, y2, wet_points_2)-P1)/(y2-y1)
+                b_k = b1 - db*(y1-y_k)
+                b_list.append(b_k)
+                db_list.append(db)
+                S_list.append(IrregularSection.get_S(self, y1, wet_points_1) - b_k*(y1-y_k) - 0.5*db*(y1-y_k)**2)
+                P_list.append(P1 - dP*(y1-y_k))
+                dP_list.append(dP)
+                n_list.append(len(wet_points_1)-2)
+                sum_list.append(sum(p[1] for p in wet_points_1[1:-1]))
+            self.__geometry_table = (levels, b_list, db_list, S_list, P_list, dP_list, n_list, sum_list)
+        return self.__geometry_table
+
+    def __get_wet_points(self, y, wet_points):
+        """
+        return the wet points to use for the depth y : the given ones, None if the geometry table can be used or if the section is
+        prismatic (its methods use direct formulas, no list is built), else the wet section.
+        """
+        if wet_points != None or self.is_prismatic() or (self.__use_geometry_table and 0 <= y < self.__y_max):
+            return wet_points
+        return self.get_wet_section(y)
+
+    def __get_table_interval(self, y):
+        """return the geometry table, the index of the interval of y and the distance from its lower level"""
+        table = self.get_geometry_table()
+        k = bisect_right(table[0], y) - 1
+        return table, k, y - table[0][k]
+
     # getter and setter which require computations and which can be simplified in children classes
 
     def get_b(self, y, wet_points=None):
         """width"""
-        wet_points = self.get_wet_section(y) if wet_points==None else wet_points
+        wet_points = self.__get_wet_points(y, wet_points)
+        if wet_points == None:
+            table, k, u = self.__get_table_interval(y)
+            return table[1][k] + table[2][k]*u
         return abs(wet_points[-1][0]-wet_points[0][0])
 
     def get_S(self, y, wet_points=None):
         """wet surface"""
-        wet_points = self.get_wet_section(y) if wet_points==None else wet_points
+        wet_points = self.__get_wet_points(y, wet_points)
+        if wet_points == None:
+            table, k, u = self.__get_table_interval(y)
+            return table[3][k] + table[1][k]*u + 0.5*table[2][k]*u**2
         s = 0
         for i in range(len(wet_points)-1):
             p_current = wet_points[i]
@@ -177,7 +351,10 @@ class IrregularSection:
 
     def get_P(self, y, wet_points=None):
         """wet perimeter"""
-        wet_points = self.get_wet_section(y) if wet_points==None else wet_points
+        wet_points = self.__get_wet_points(y, wet_points)
+        if wet_points == None:
+            table, k, u = self.__get_table_interval(y)
+            return table[4][k] + table[5][k]*u
         p = 0
         for i in range(len(wet_points)-1):
             p_current = wet_points[i]
@@ -189,7 +366,7 @@ class IrregularSection:
     
     def get_R(self, y, wet_points=None):
         """hydraulic radius"""
-        wet_points = self.get_wet_section(y) if wet_points==None else wet_points
+        wet_points = self.__get_wet_points(y, wet_points)
         return self.get_S(y, wet_points) / self.get_P(y, wet_points)
 
     def get_V(self, Q, y, wet_points=None):
@@ -206,7 +383,7 @@ class IrregularSection:
 
     def get_Sf(self, Q, y, wet_points=None, friction_law="Ferguson"):
         """slope of energy grade line, computed with a friction law"""
-        wet_points = self.get_wet_section(y) if wet_points==None else wet_points
+        wet_points = self.__get_wet_points(y, wet_points)
         if friction_law=="Coussot":
             # check that K/tauc, taux/ro are defined... 
             sinus = (((self.get_V(Q, y, wet_points=wet_points)/y)**(3/10))*self.get_A_for_coussot(y)*(self.get_K_over_tauc()**(9/10))+1)*self.get_tauc_over_rho()/(G*self.get_R(y, wet_points))
@@ -222,7 +399,7 @@ class IrregularSection:
     
     def get_Cf(self, Q, y, wet_points=None, friction_law="Ferguson"):
         """dimensionless friction coefficient"""
-        wet_points = self.get_wet_section(y) if wet_points==None else wet_points
+        wet_points = self.__get_wet_points(y, wet_points)
         if friction_law=="Manning-Strickler":
             # check that manning coef is defined...
             return (G*self.get_manning()**2) / (self.get_R(y, wet_points)**(1/3)) # manning
@@ -239,28 +416,34 @@ class IrregularSection:
 
     def get_Fr(self, Q, y, wet_points=None):
         """Froude number"""
-        wet_points = self.get_wet_section(y) if wet_points==None else wet_points
+        wet_points = self.__get_wet_points(y, wet_points)
         return ((Q**2 * self.get_b(y, wet_points))/(G * self.get_S(y, wet_points)**3))**0.5
 
     def get_Fs(self, Q, y, wet_points=None):
         """specific force"""      
-        wet_points = self.get_wet_section(y) if wet_points==None else wet_points
-        centroid = get_centroid(wet_points)
-        centroid_depth = y-centroid[1]
+        wet_points = self.__get_wet_points(y, wet_points)
+        if wet_points == None:
+            table, k, _ = self.__get_table_interval(y)
+            centroid_depth = y - (2*y+table[7][k])/(table[6][k]+2)
+        else:
+            centroid = get_centroid(wet_points)
+            centroid_depth = y-centroid[1]
         area = self.get_S(y, wet_points=wet_points)
         return centroid_depth*area + Q**2 / (area*G)
 
+    @DepthCache.memoize("yc", lambda section: section.get_geometry_key())
     def get_yc(self, Q):
         """critical water depth"""
+        from scipy.optimize import brentq, newton # scipy is only imported when a root has to be found
         def equation_function(y): # Froude number is one for critical depth
-            wet_points = self.get_wet_section(y)
-            Fr = self.get_Fr(Q, y, wet_points=wet_points)
+            Fr = self.get_Fr(Q, y)
             return 1-Fr
         try:
             yc = brentq(equation_function, Y_MIN, 0.999*self.get_y_max())
         except ValueError:  # f(a) and f(b) must have different signs
             try:
                 yc = newton(equation_function, Y_MIN, tol=0.001, maxiter=1000) # Utilisation de la méthode de la sécante
+                Telemetry.count("secant_fallback")
                 print("Warning : brentq method failed to converge for yc, used Newton")
             except RuntimeError as e:  # Failed to converge
                 print(f"WARNING : Newton method failed to converge.")
@@ -268,8 +451,10 @@ class IrregularSection:
         yc = max(yc, 0)
         return yc
 
+    @DepthCache.memoize("yn", lambda section, friction_law="Ferguson": (section.get_geometry_key(), friction_law, section.get_S0(up_direction=section.is_downstream())))
     def get_yn(self, Q, friction_law="Ferguson"):
         """normal water depth"""
+        from scipy.optimize import brentq, newton
         b = self.is_downstream()
         s0 = self.get_S0(up_direction=b)
         if s0 < 0:
@@ -277,8 +462,7 @@ class IrregularSection:
         elif s0 == 0:
             return self.__y_max
         def equation_function(y): # Friction law for a uniform regim leads to this equation
-            wet_points = self.get_wet_section(y)
-            sf = self.get_Sf(Q, y, wet_points=wet_points, friction_law=friction_law)
+            sf = self.get_Sf(Q, y, friction_law=friction_law)
             s0 = self.get_S0(up_direction=b)
             return sf-s0
         try:
@@ -286,6 +470,7 @@ class IrregularSection:
         except ValueError:  # f(a) and f(b) must have different signs
             try:
                 yn = newton(equation_function, Y_MIN, tol=0.001, maxiter=1000)
+                Telemetry.count("secant_fallback")
                 print("Warning : brentq method failed to converge for yn, used Newton")
             except RuntimeError as e:  # Failed to converge
                 print(f"WARNING : Newton method failed to converge.")
@@ -300,15 +485,19 @@ class IrregularSection:
         It returns the supercritical solution if supercritical is True, subcritical else.
         yc is given to know the range of solution ([0,yc] for supercritical and [yc,+inf] for subcritical).
         """
+        from scipy.optimize import brentq
         yc = yc if yc != None else self.get_yc(Q)
         def objective_function(y):
             return Hs - self.get_Hs(Q, y)
         try:
             if supercritical:
-                return brentq(objective_function, Y_MIN, yc)
+                y, root = brentq(objective_function, Y_MIN, yc, full_output=True)
             else:
-                return brentq(objective_function, yc, 0.999*self.get_y_max())
+                y, root = brentq(objective_function, yc, 0.999*self.get_y_max(), full_output=True)
+            Telemetry.count("brentq_iteration", root.iterations)
+            return y
         except ValueError as e:
+            Telemetry.count("brentq_failure")
             y_solution = "Y_MIN" if supercritical else "Y_MAX"
             print(f"BIG WARNING : in computing y from Hs, could not find a fine solution, returned {y_solution} (x={self.get_x()})")
             return Y_MIN if supercritical else 0.999*self.get_y_max()
@@ -319,7 +508,9 @@ class IrregularSection:
         return self.__x
 
     def get_z(self):
-        return self.__z
+        if self.__state is None:
+            return self.__z
+        return self.__state.z.item(self.__index)
         
     def get_z_min(self):
         return self.__z_min
@@ -334,10 +525,25 @@ class IrregularSection:
     def set_z(self, z):
         if z < self.__z_min:
             raise ValueError("z can not be lower than z_min.")
-        self.__z = z
+        if self.__state is None:
+            self.__z = z
+        else:
+            self.__state.z[self.__index] = z
+
+    def set_state(self, state, index):
+        """
+        the elevation of the section is then read and written in state.z[index] (see ProfileState), state=None detaches the section
+        """
+        z = self.get_z()
+        self.__state = state
+        self.__index = index
+        if state is None:
+            self.__z = z
+        else:
+            state.z[index] = z
     
     def set_z_min(self, z_min):
-        if self.__z < z_min:
+        if self.get_z() < z_min:
             raise ValueError("z_min can not be greater than z")
         self.__z_min = z_min
 
@@ -391,8 +597,12 @@ class IrregularSection:
     def get_granulometry(self):
         return self.__granulometry
 
+    def get_geometry_key(self):
+        """value which changes whenever the geometry of the section changes (used as a cache key, see DepthCache)"""
+        return self.__geometry_version
+
     def get_points(self):
-        return copy(self.__points)
+        return copy(self.__get_geometry()[0])
 
     def get_S0(self, up_direction=False):
         """
@@ -400,37 +610,39 @@ class IrregularSection:
         """
         if up_direction:
             if self.__is_upstream:
-                dz = self.__z*1000 - self.__down_section.__z*1000
+                dz = self.get_z()*1000 - self.__down_section.get_z()*1000
                 dx = self.__down_section.__x - self.__x
             else:
-                dz = self.__up_section.__z*1000 - self.__z*1000
+                dz = self.__up_section.get_z()*1000 - self.get_z()*1000
                 dx = self.__x - self.__up_section.__x
             return (dz/dx)/1000
         else:
             if self.__is_downstream:
-                dz = self.__up_section.__z*1000 - self.__z*1000
+                dz = self.__up_section.get_z()*1000 - self.get_z()*1000
                 dx = self.__x - self.__up_section.__x
             else:
-                dz = self.__z*1000 - self.__down_section.__z*1000
+                dz = self.get_z()*1000 - self.__down_section.get_z()*1000
                 dx = self.__down_section.__x - self.__x
             return (dz/dx)/1000
 
     # operators overloading
 
     def __str__(self):
-        return f'IrregularSection : x={self.__x}, z={self.__z}'
+        return f'IrregularSection : x={self.__x}, z={self.get_z()}'
 
     # plot stuff
 
     def plot(self, y=None):
+        import matplotlib.pyplot as plt
         fig, ax = plt.subplots()
-        ax.plot(self.__x_list, np.array(self.__y_list) + self.__z)
+        _, x_list, y_list, _ = self.__get_geometry()
+        ax.plot(x_list, np.array(y_list) + self.get_z())
         if y != None:
             wet_points = self.get_wet_section(y)
             wpx = [p[0] for p in wet_points]
             wpy = [p[1] for p in wet_points]
-            ax.plot(wpx, np.array([y for _ in range(len(wpx))]) + self.__z, "b--", label="water depth")
-            ax.fill_between(wpx, np.array(wpy) + self.__z, np.array(wpy)+y+self.__z, color="cyan")
+            ax.plot(wpx, np.array([y for _ in range(len(wpx))]) + self.get_z(), "b--", label="water depth")
+            ax.fill_between(wpx, np.array(wpy) + self.get_z(), np.array(wpy)+y+self.get_z(), color="cyan")
         plt.title(f"irregular section at x = {self.__x}")
         return fig
 
@@ -440,6 +652,11 @@ class IrregularSection:
     def is_rectangular():
         return False
 
+    @staticmethod
+    def is_prismatic():
+        """True if the geometry is fully described by a few parameters (b, s...) and does not depend on a point list"""
+        return False
+
     @staticmethod
     def interp(up_section, down_section, x=None):
         """
@@ -456,14 +673,14 @@ class IrregularSection:
             x = 0.5*(up_section.__x+down_section.__x)
         interpolated_section = up_section.copy()
         interpolated_section.__x = x
-        interpolated_section.__z = np.interp(x, [up_section.__x, down_section.__x], [up_section.__z, down_section.__z])
+        interpolated_section.__z = np.interp(x, [up_section.__x, down_section.__x], [up_section.get_z(), down_section.get_z()])
         interpolated_section.__z_min = np.interp(x, [up_section.__x, down_section.__x], [up_section.__z_min, down_section.__z_min])
         interpolated_section.__manning = up_section.get_manning()
         interpolated_section.__K_over_tauc = up_section.get_K_over_tauc()
         interpolated_section.__tauc_over_rho = up_section.get_tauc_over_rho()
         interpolated_section.__points = copy(up_section.__points)
-        interpolated_section.x_list = copy(up_section.__x_list)
-        interpolated_section.y_list = copy(up_section.__y_list)
+        interpolated_section.__geometry_table = None
+        interpolated_section.__geometry_version += 1
         interpolated_section.__up_section = up_section
         interpolated_section.__down_section = down_section
         interpolated_section.__is_downstream = False
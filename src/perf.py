@@ -1,15 +1,27 @@
-import time as t
-import numpy as np
-from prettytable import PrettyTable
+import sys
+import json
+from time import perf_counter_ns
 from src.utils import time_to_string
 
+ROOT_NAME = "total" # root of the call stacks : time spent outside of the measured methods
+
 class Performance:
     """
-    class used for storing times spent by each function using the decorator @measure_perf
+    Hierarchical profiler of the methods decorated with @measure_perf.
+    The decorator only registers the method : nothing is wrapped (no cost at all) until start() replaces the registered methods by
+    timing wrappers, which stop() removes. Methods are named by their qualified name (Class.method) and timed with perf_counter_ns,
+    with their inclusive time (children included) and exclusive time (children excluded), per method and per call stack.
+    Results are given as a PrettyTable (print_perf, save_perf), a json file (save_json) or a collapsed stack file (save_collapsed,
+    one line "root;caller;callee microseconds" per stack, the input of flamegraph.pl or speedscope).
     """
-    dict_of_perf = dict()
+    dict_of_perf = dict()   # qualified name -> [number of call, inclusive time (ns), exclusive time (ns)]
+    dict_of_stack = dict()  # call stack "total;caller;callee" -> exclusive time (ns)
+    dict_of_count = dict()  # cache name -> [hits, misses]
     time_start = None
     time_end = None
+    __registry = []         # [function, wrapper, owner, attribute name] of every decorated method
+    __stack = []            # [call stack, time spent in children (ns)] of the running measured calls
+    __depth = dict()        # qualified name -> number of running calls (recursive calls are counted once in inclusive time)
 
     @staticmethod
     def get_perf_table():
@@ -17,61 +29,170 @@ class Performance:
         return the table of the stored performances
         """
         if Performance.time_end == None:
+            Performance.stop()
             print("automatic stop of perf measure.")
-            Performance.time_end = t.time()
-        te = Performance.time_end
-        ts = Performance.time_start
-        table = PrettyTable(['method name', '% of the execution time', 'total time spent (s)', 'number of call', 'mean time spent by call (s)'])
-        for key, value in Performance.dict_of_perf.items():
-            table.add_row([key, f"{100*(value[0]/(te-ts)):.2f}%", float(f"{value[0]:.8f}"), f"{value[1]}", f"{value[0]/value[1]:.8f}"])
+        from prettytable import PrettyTable
+        total = Performance.get_total_time()
+        table = PrettyTable(['method name', '% of the execution time', 'total time spent (s)', 'exclusive time spent (s)', 'number of call', 'mean time spent by call (s)'])
+        for key, (nb_call, inclusive, exclusive) in Performance.dict_of_perf.items():
+            table.add_row([key, f"{100*1e-9*inclusive/total:.2f}%", float(f"{1e-9*inclusive:.8f}"), float(f"{1e-9*exclusive:.8f}"), f"{nb_call}", f"{1e-9*inclusive/nb_call:.8f}"])
         return table
 
+    @staticmethod
+    def get_count_table():
+        """
+        return the table of the stored cache counters (see count)
+        """
+        from prettytable import PrettyTable
+        table = PrettyTable(['cache name', 'hits', 'misses', 'hit rate'])
+        for key, value in Performance.dict_of_count.items():
+            table.add_row([key, value[0], value[1], f"{100*value[0]/(value[0]+value[1]):.2f}%"])
+        return table
+
+    @staticmethod
+    def get_total_time():
+        """time between start and stop (or now), in seconds"""
+        te = Performance.time_end if Performance.time_end != None else perf_counter_ns()
+        return 1e-9*(te - Performance.time_start)
+
     @staticmethod
     def print_perf():
-        ts = Performance.time_start
-        te = Performance.time_end
-        if ts == None:
+        if Performance.time_start == None:
             print("nothing measured")
         else:
-            if te == None:
+            if Performance.time_end == None:
                 print("automatic stop of perf measure.")
-                Performance.time_end = t.time()
-                te = Performance.time_end
-            print(f"total time : {time_to_string(te-ts)} \n")
+                Performance.stop()
+            print(f"total time : {time_to_string(Performance.get_total_time())} \n")
             table = Performance.get_perf_table()
-            # for key, value in Performance.dict_of_perf.items():
-            #     table.add_row([key, f"{100*(sum(value)/(te-ts)):.2f}%", f"{sum(value):.2f}s", f"{len(value)}", f"{np.mean(value)}s"])
             print(table.get_string(sortby="total time spent (s)", reversesort=True))
+            if len(Performance.dict_of_count) > 0:
+                print(Performance.get_count_table())
 
     @staticmethod
     def save_perf(filename):
         table = Performance.get_perf_table()
         with open(filename, 'w') as f:
-            f.writelines(f"total time = {Performance.time_end - Performance.time_start}\n")
+            f.writelines(f"total time = {Performance.get_total_time()}\n")
             f.writelines(table.get_string(sortby="total time spent (s)", reversesort=True))
+            if len(Performance.dict_of_count) > 0:
+                f.writelines("\n"+Performance.get_count_table().get_string())
+
+    @staticmethod
+    def save_json(filename):
+        """write the stored performances in a json file (times in seconds)"""
+        if Performance.time_end == None:
+            Performance.stop()
+        data = {
+            "total_time": Performance.get_total_time(),
+            "methods": [{"name": key, "nb_call": nb_call, "inclusive_time": 1e-9*inclusive, "exclusive_time": 1e-9*exclusive} for key, (nb_call, inclusive, exclusive) in Performance.dict_of_perf.items()],
+            "stacks": {key: 1e-9*value for key, value in Performance.dict_of_stack.items()},
+            "caches": {key: {"hits": value[0], "misses": value[1]} for key, value in Performance.dict_of_count.items()}
+        }
+        with open(filename, 'w') as f:
+            json.dump(data, f, indent=4)
+
+    @staticmethod
+    def save_collapsed(filename):
+        """write the exclusive time (microseconds) of every call stack in the collapsed format of flamegraphs"""
+        if Performance.time_end == None:
+            Performance.stop()
+        with open(filename, 'w') as f:
+            for key, value in Performance.dict_of_stack.items():
+                if value >= 1000:
+                    f.write(f"{key} {value//1000}\n")
 
     @staticmethod
     def start():
-        Performance.time_start = t.time()
+        """reset the stored performances and wrap the registered methods"""
+        Performance.dict_of_perf = dict()
+        Performance.dict_of_stack = dict()
+        Performance.dict_of_count = dict()
+        Performance.__depth = dict()
+        Performance.__stack = [[ROOT_NAME, 0]]
+        Performance.time_end = None
+        for entry in Performance.__registry:
+            Performance.__install(entry, entry[1])
+        Performance.time_start = perf_counter_ns()
 
     @staticmethod
     def stop():
-        Performance.time_end = t.time()
+        """put the registered methods back and give the time spent outside of them to the root of the stacks"""
+        if Performance.time_end != None or Performance.time_start == None:
+            return
+        Performance.time_end = perf_counter_ns()
+        for entry in Performance.__registry:
+            Performance.__install(entry, entry[0])
+        root = Performance.__stack[0]
+        Performance.dict_of_stack[ROOT_NAME] = max(0, Performance.time_end - Performance.time_start - root[1])
+
+    @staticmethod
+    def count(name, hit):
+        """
+        count a hit (or a miss if hit is False) of the cache called name, only while performances are measured
+        """
+        if Performance.time_start == None or Performance.time_end != None:
+            return
+        counter = Performance.dict_of_count.setdefault(name, [0, 0])
+        counter[0 if hit else 1] += 1
 
     @staticmethod
     def measure_perf(func):
         """
-        decorator home-made in order to store time spent in the decorated method during the full execution
+        decorator registering func to be timed while performances are measured (see start). It returns func itself, so decorated
+        methods cost nothing when nothing is measured (the timing wrapper is returned if a measure is running).
         """
+        entry = [func, Performance.__build_wrapper(func), None, None]
+        Performance.__registry.append(entry)
+        if Performance.time_start != None and Performance.time_end == None:
+            return entry[1]
+        return func
+
+    @staticmethod
+    def __build_wrapper(func):
+        name = func.__qualname__
         def wrapper(*args, **kargs):
-            if Performance.time_start == None:
+            stack = Performance.__stack
+            depth = Performance.__depth
+            path = stack[-1][0] + ";" + name
+            frame = [path, 0]
+            stack.append(frame)
+            depth[name] = depth.get(name, 0) + 1
+            ts = perf_counter_ns()
+            try:
                 return func(*args, **kargs)
-            ts = t.time()
-            result = func(*args, **kargs)
-            te = t.time()
-            if func.__name__ in Performance.dict_of_perf:
-                Performance.dict_of_perf[func.__name__] = Performance.dict_of_perf[func.__name__][0]+(te-ts), Performance.dict_of_perf[func.__name__][1]+1
-            else:
-                Performance.dict_of_perf[func.__name__] = (te-ts), 1
-            return result
+            finally:
+                elapsed = perf_counter_ns() - ts
+                stack.pop()
+                stack[-1][1] += elapsed
+                depth[name] -= 1
+                record = Performance.dict_of_perf.get(name)
+                if record is None:
+                    record = Performance.dict_of_perf[name] = [0, 0, 0]
+                record[0] += 1
+                if depth[name] == 0:
+                    record[1] += elapsed
+                record[2] += elapsed - frame[1]
+                Performance.dict_of_stack[path] = Performance.dict_of_stack.get(path, 0) + elapsed - frame[1]
+        wrapper.__name__ = func.__name__
+        wrapper.__qualname__ = func.__qualname__
+        wrapper.__doc__ = func.__doc__
+        wrapper.__wrapped__ = func
         return wrapper
+
+    @staticmethod
+    def __install(entry, function):
+        """set function (the method or its wrapper) as the attribute of the class (or module) defining the method of entry"""
+        if entry[2] is None:
+            owner = sys.modules.get(entry[0].__module__)
+            for name in entry[0].__qualname__.split(".")[:-1]:
+                owner = getattr(owner, name, None)
+            if owner is None:
+                return
+            for name, value in vars(owner).items(): # the attribute name can be mangled (__private methods)
+                if value is entry[0] or value is entry[1]:
+                    entry[2], entry[3] = owner, name
+                    break
+            else:
+                return
+        setattr(entry[2], entry[3], function)
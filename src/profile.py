@@ -1,14 +1,16 @@
 import numpy as np
+import os
 import copy
-import scipy.optimize as op
 import pickle as pkl
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-from mpl_toolkits.mplot3d import Axes3D
-from time import time
+from time import time, perf_counter
 from src.irregularSection import IrregularSection
 from src.perf import Performance
-from src.utils import Y_MIN, G, get_matrix_max, read_hecras_data, reverse_data, time_to_string
+from src.checkpoint import Checkpoint
+from src.depthCache import DepthCache
+from src.envelope import Envelope
+from src.profileState import ProfileState
+from src.telemetry import Telemetry
+from src.utils import Y_MIN, G, read_hecras_data, reverse_data, time_to_string
 
 class Profile():
 
@@ -30,36 +32,88 @@ class Profile():
         """
 
         x_0 = self.get_x_list()
-        new_x = [x_0[0]]
+        section_list = self.__section_list
+        new_list_of_section = [section_list[0]]
         for i in range(len(x_0)-1):
             x_up = x_0[i]
             x_down = x_0[i+1]
             nb_new_section = int(np.ceil((x_down-x_up)/dx - 1))
             dx_i = (x_down-x_up)/(nb_new_section+1)
-            for k in range(1, nb_new_section+1):
-                new_x.append(x_up+k*dx_i)
-            new_x.append(x_down)
-        new_list_of_section = []
-        x_up = x_0[0]
-        x_down = x_0[1]
-        segment_index = 0
-        for xi in new_x:
-            if xi in x_0:
-                index = x_0.index(xi)
-                new_list_of_section.append(self.get_section(index))
-            else:
-                while xi > x_down:
-                    segment_index += 1
-                    x_up = x_0[segment_index]
-                    x_down = x_0[segment_index+1]
-                up_section = self.get_section(segment_index)
-                down_section = self.get_section(segment_index+1)
-                new_section = up_section.interp_as_up_section(down_section, xi)
-                new_list_of_section.append(new_section)
+            new_x = [x_up+k*dx_i for k in range(1, nb_new_section+1)]
+            new_list_of_section += section_list[i].interp_list_as_up_section(section_list[i+1], new_x) # sections of a segment share their geometry
+            new_list_of_section.append(section_list[i+1])
         self.__section_list = new_list_of_section
         self.setup_section_list()
 
+    def complete_adaptive(self, Q, nb_section, ratio=10, dx_max=None, y_list=None, friction_law="Ferguson", upstream_condition="normal_depth", downstream_condition="normal_depth"):
+        """
+        Add new sections to the profile such that it has nb_section sections, placed densely where the bed slope, the width or the
+        Froude number vary sharply and coarsely elsewhere. Original sections are kept.
+        Variations are measured at each original section for the water discharge Q, with the water depth y_list (computed by
+        compute_depth on the original profile by default). They define a density of sections, piecewise linear along the profile,
+        which is ratio times higher at the sharpest variation than in a stretch without any variation : new sections are placed
+        such that there is the same amount of density between two consecutive sections (equidistribution).
+        If dx_max is given, sections are never further apart than dx_max (the budget may then be exceeded).
+        Be careful : the time step of an event is limited by the smallest distance between two sections (see find_best_dt),
+        a high ratio reduces it.
+        """
+        x = np.array(self.get_x_list(), dtype=np.float64)
+        nb_segment = len(x)-1
+        if nb_section <= nb_segment+1:
+            print(f"WARNING : adaptive refinement needs more than {nb_segment+1} sections (nb_section={nb_section}), profile unchanged")
+            return
+        if y_list is None:
+            y_list = self.compute_depth(Q, friction_law=friction_law, upstream_condition=upstream_condition, downstream_condition=downstream_condition)
+        section_list = self.__section_list
+        b = np.array([s.get_b(y_list[i]) for i, s in enumerate(section_list)], dtype=np.float64)
+        Fr = np.array([s.get_Fr(Q, y_list[i]) for i, s in enumerate(section_list)], dtype=np.float64)
+        L = np.diff(x)
+        S = -np.diff(np.array(self.get_z_list(), dtype=np.float64)) / L
+
+        # variation indicators at each original section, normalized by their maximum
+        slope_change = np.zeros(nb_segment+1)
+        slope_change[1:-1] = np.abs(np.diff(S))
+        width_change = 2*np.abs(np.diff(b)) / np.maximum(b[:-1]+b[1:], Y_MIN)
+        Fr_change = np.abs(np.diff(Fr))
+        indicator = np.zeros(nb_segment+1)
+        for change in (slope_change, np.maximum(np.append(width_change, 0), np.insert(width_change, 0, 0)), np.maximum(np.append(Fr_change, 0), np.insert(Fr_change, 0, 0))):
+            change = np.nan_to_num(change)
+            if change.max() > 0:
+                indicator = np.maximum(indicator, change/change.max())
+        density = 1 + (ratio-1)*indicator
+
+        # number of intervals in each segment, proportional to the integral of the density (largest remainder)
+        weight = 0.5*L*(density[:-1]+density[1:])
+        ideal = (nb_section-1)*weight/weight.sum()
+        nb_interval = np.maximum(np.floor(ideal).astype(int), 1)
+        remainder = ideal - nb_interval
+        missing = nb_section-1 - nb_interval.sum()
+        if missing > 0:
+            nb_interval[np.argsort(-remainder)[:missing]] += 1
+        while missing < 0:
+            candidate = np.flatnonzero(nb_interval > 1)
+            nb_interval[candidate[np.argmin(remainder[candidate])]] -= 1
+            remainder = ideal - nb_interval
+            missing += 1
+        if dx_max is not None:
+            nb_interval = np.maximum(nb_interval, np.ceil(L/dx_max - 1e-9).astype(int))
 
+        new_list_of_section = [section_list[0]]
+        for i in range(nb_segment):
+            n = nb_interval[i]
+            d_up, d_down = density[i], density[i+1]
+            target = weight[i]*np.arange(1, n)/n # integral of the density from x_up to each new section
+            slope = (d_down-d_up)/L[i]
+            if abs(slope) < 1e-12:
+                s = target/d_up
+            else:
+                s = (np.sqrt(d_up**2 + 2*slope*target) - d_up)/slope
+            new_x = (x[i] + s).tolist()
+            new_list_of_section += section_list[i].interp_list_as_up_section(section_list[i+1], new_x)
+            new_list_of_section.append(section_list[i+1])
+        self.__section_list = new_list_of_section
+        self.setup_section_list()
+        print(f"INFO : adaptive refinement, {len(x)} -> {len(new_list_of_section)} sections (dx from {np.min(np.diff(self.get_x_list())):.3g} to {np.max(np.diff(self.get_x_list())):.3g})")
 
     def complete_bis(self, dx, starting_index=0, ending_index=-1):
         """
@@ -91,6 +145,8 @@ class Profile():
                 new_list.append(new_section)
                 up_section.set_down_section(new_section)
         self.__section_list[starting_index:ending_index+1] = new_list
+        self.__build_state()
+        self.__hydraulic_index = None
 
     def setup_section_list(self):
         """
@@ -116,15 +172,54 @@ class Profile():
                     section.set_is_downstream(False)
                     section.set_up_section(section_list[i-1])
                     section.set_down_section(section_list[i+1])
+        self.__build_state()
+        self.__hydraulic_index = None
 
-    def copy(self):
-        """return a safe copy of this profile"""
+    def __build_state(self):
+        """build the state of the profile (see ProfileState), which then holds the elevation of its sections"""
+        self.__state = ProfileState.from_section_list(self.__section_list)
+        for i, section in enumerate(self.__section_list):
+            section.set_state(self.__state, i)
+
+    def copy(self, share_geometry=False):
+        """
+        return a safe copy of this profile.
+        If share_geometry is True, sections are light copies sharing their geometry with the sections of this profile
+        (see IrregularSection.light_copy) : it is much cheaper and changing the bed of the copy (set_z_list, restore, events...)
+        does not change this profile.
+        """
         section_list = []
         for s in self.__section_list:
-            section_list.append(s.copy())
-        copied_profile = Profile(section_list)
+            section_list.append(s.light_copy() if share_geometry else s.copy())
+        copied_profile = Profile(section_list, name=self.__name)
         return copied_profile
 
+    def snapshot(self):
+        """
+        return the mutable state of the profile : bed elevation z and, for prismatic profiles, width b (dict of arrays).
+        It can be given back to restore (on this profile or on a copy of it) and costs two arrays whatever the geometry.
+        """
+        snapshot = {"z": self.__state.z.copy()}
+        if self.__state.is_prismatic():
+            snapshot["b"] = np.array([s.get_b() for s in self.__section_list], dtype=np.float64)
+        return snapshot
+
+    def restore(self, snapshot):
+        """go back to the state saved by snapshot"""
+        if len(snapshot["z"]) != self.get_nb_section():
+            raise(ValueError(f"the snapshot has {len(snapshot['z'])} sections, the profile {self.get_nb_section()}"))
+        if "b" in snapshot:
+            for section, b in zip(self.__section_list, snapshot["b"].tolist()):
+                if section.get_b() != b:
+                    section.set_b(b)
+            self.__state.set_b(snapshot["b"])
+        self.__state.z[:] = snapshot["z"]
+        self.__hydraulic_index = None
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.setup_section_list() # sections are pickled without their links (see IrregularSection.__getstate__)
+
     def export(self, filename="exported_profile.pkl"):
         """export this profile using pickle"""
         pkl.dump(self, open(filename, "wb"))
@@ -149,6 +244,8 @@ class Profile():
         hs_list = [s.get_Hs(Q, y_list[i]) for i, s in enumerate(self.get_section_list())]
         hsc_list = [s.get_Hs(Q, yc_list[i]) for i, s in enumerate(self.get_section_list())]
         Fs_list = [s.get_Fs(Q, y_list[i]) for i, s in enumerate(self.get_section_list())]
+        z_list = self.__state.z.tolist()
+        S0_list = self.__state.get_S0().tolist()
         hydraulic_index = []
 
         i_current = 0
@@ -163,16 +260,18 @@ class Profile():
             # print(f"start at x = {self.get_section(i_current).get_x()} toward {'down' if down_direction else 'up'} direction")
             
             if down_direction:
+                Telemetry.count("down_sweep")
                 while i_current < self.get_nb_section()-1: #i_memory_3:#
                     current_section = self.get_section(i_current)
                     next_section = self.get_section(i_current+1)
+                    reach = (z_list[i_current], z_list[i_current+1], S0_list[i_current])
                     if y_list[i_current] > yc_list[i_current]:                    
-                        y_next = self.__compute_next_y(Q, current_section, next_section, yc_list[i_current], hsc_list[i_current], yc_list[i_current+1], supercritical=True, method=method, friction_law=friction_law)
+                        y_next = self.__compute_next_y(Q, current_section, next_section, yc_list[i_current], hsc_list[i_current], yc_list[i_current+1], reach, supercritical=True, method=method, friction_law=friction_law)
                     else:
-                        y_next = self.__compute_next_y(Q, current_section, next_section, y_list[i_current], hs_list[i_current], yc_list[i_current+1], supercritical=True, method=method, friction_law=friction_law)
+                        y_next = self.__compute_next_y(Q, current_section, next_section, y_list[i_current], hs_list[i_current], yc_list[i_current+1], reach, supercritical=True, method=method, friction_law=friction_law)
                     hs_next = next_section.get_Hs(Q, y_next)
                     Fs_next = next_section.get_Fs(Q, y_next)
-                    if i_current != self.get_nb_section()-2 and (Fs_next > Fs_list[i_current+1] or hs_list[i_current+1] + next_section.get_z() > hs_list[i_current] + current_section.get_z()):
+                    if i_current != self.get_nb_section()-2 and (Fs_next > Fs_list[i_current+1] or hs_list[i_current+1] + z_list[i_current+1] > hs_list[i_current] + z_list[i_current]):
                         y_list[i_current+1] = y_next
                         hs_list[i_current+1] = hs_next
                         Fs_list[i_current+1] = Fs_next 
@@ -180,15 +279,17 @@ class Profile():
                 down_direction = False
                 i_memory_3 = i_memory_2
             else:
+                Telemetry.count("up_sweep")
                 i_current = i_memory_2
                 update_flag = False
                 while i_current > 0:
                     current_section = self.get_section(i_current)
                     next_section = self.get_section(i_current-1)
+                    reach = (z_list[i_current], z_list[i_current-1], S0_list[i_current-1])
                     if y_list[i_current] < yc_list[i_current]:                    
-                        y_next = self.__compute_next_y(Q, current_section, next_section, yc_list[i_current], hsc_list[i_current], yc_list[i_current-1], supercritical=False, method=method, friction_law=friction_law)
+                        y_next = self.__compute_next_y(Q, current_section, next_section, yc_list[i_current], hsc_list[i_current], yc_list[i_current-1], reach, supercritical=False, method=method, friction_law=friction_law)
                     else:
-                        y_next = self.__compute_next_y(Q, current_section, next_section, y_list[i_current], hs_list[i_current], yc_list[i_current-1], supercritical=False, method=method, friction_law=friction_law)
+                        y_next = self.__compute_next_y(Q, current_section, next_section, y_list[i_current], hs_list[i_current], yc_list[i_current-1], reach, supercritical=False, method=method, friction_law=friction_law)
                     hs_next = next_section.get_Hs(Q, y_next)
                     Fs_next = next_section.get_Fs(Q, y_next)
                     Fs_current = Fs_list[i_current-1]
@@ -218,6 +319,8 @@ class Profile():
 
         # y_list = yc_list
 
+        self.__hydraulic_index = hydraulic_index
+
         if plot:
             fig = self.plot(y=y_list, Q=Q, friction_law=friction_law, compare=compare, background=True)
             if hydraulic_jump_analysis:
@@ -246,13 +349,20 @@ class Profile():
         """
         find the time step which allows to get a Courant–Friedrichs–Lewy constant equal to cfl
         """
-        dt_list = []
-        for i, s in enumerate(self.get_section_list()[:-1]):
-            dx = s.get_down_section().get_x() - s.get_x()
-            v = 0.5*(s.get_V(Q, y_list[i]) + s.get_down_section().get_V(Q, y_list[i+1]))
-            dt_list.append(cfl*dx/v)
-        # print(f"section which impose dt is at (x = {self.get_section(dt_list.index(min(dt_list))).get_x()}, x_next={self.get_section(dt_list.index(min(dt_list))+1).get_x()}) / (y = {y_list[dt_list.index(min(dt_list))]}, y_next={y_list[dt_list.index(min(dt_list))+1]}) / (V = {self.get_section(dt_list.index(min(dt_list))).get_V(Q, y_list[dt_list.index(min(dt_list))])}, V_next={self.get_section(dt_list.index(min(dt_list))+1).get_V(Q, y_list[dt_list.index(min(dt_list))+1])}) ")
-        return min(dt_list)
+        return self.get_dt_limiter(Q, y_list, cfl=cfl)[0]
+
+    @Performance.measure_perf
+    def get_dt_limiter(self, Q, y_list, cfl=1):
+        """
+        return (dt, index, v, dx) : the time step of find_best_dt and the reach which imposes it,
+        between the sections index and index+1, with its mean velocity v and its length dx.
+        """
+        dx = self.__state.get_dx()
+        V = self.get_V_list(Q, y_list)
+        v = 0.5*(V[:-1] + V[1:])
+        dt_array = cfl*dx/v
+        index = int(np.argmin(dt_array))
+        return float(dt_array[index]), index, float(v[index]), float(dx[index])
 
     @Performance.measure_perf
     def update_bottom(self, Q, y, QsIn0, dt, law, plot=False, friction_law="Ferguson"):
@@ -268,16 +378,20 @@ class Profile():
         if plot:
             V0 = self.get_stored_volume()
             fig = self.plot(Q=Q, y=y, friction_law=friction_law)
-        y_up = y[0]
-        for i, section in enumerate(self.__section_list):
-            if section.is_downstream():
-                y_down = y[i]
-            else:
-                y_down = y[i+1]
-            QsIn = section.update_bottom(Q, y_up, y[i], y_down, QsIn, dt, law)
-            y_up = y[i]
+        if self.__state.is_rectangular():
+            QsIn = self.__update_bottom_array(Q, y, QsIn0, dt, law)
+        else:
+            y_up = y[0]
+            for i, section in enumerate(self.__section_list):
+                if section.is_downstream():
+                    y_down = y[i]
+                else:
+                    y_down = y[i+1]
+                QsIn = section.update_bottom(Q, y_up, y[i], y_down, QsIn, dt, law)
+                y_up = y[i]
 
         if plot:
+            import matplotlib.pyplot as plt
             x = self.get_x_list()
             ax1 = fig.get_axes()[0]
             ax1.plot(x, self.get_z_list(), "s-", label="new z")
@@ -289,13 +403,44 @@ class Profile():
 
         return QsIn
 
-    def compute_event(self, hydrogram, t_hydrogram, law, sedimentogram=None, backup=False, debug=False, method="ImprovedEuler", friction_law="Ferguson", cfl=1, critical=False, upstream_condition="normal_depth", downstream_condition="normal_depth", plot=False):
+    def __update_bottom_array(self, Q, y, QsIn0, dt, law):
+        """
+        Batched version of RectangularSection.update_bottom for the whole profile, used by update_bottom.
+        The transport capacity of every section only depends on the state before the step, and so does the cap Qs_out_max :
+        the sediment discharge going out of each section is known at once and the discharge going in is the one of the up section.
+        """
+        state = self.__state
+        S = state.get_bed_area()
+        Qs_out = np.minimum(law.compute_Qs_array(state, Q, np.asarray(y, dtype=np.float64)), S*(state.z-state.z_min)/dt) # z can not be less than zmin
+        Qs_in = np.concatenate(([QsIn0], Qs_out[:-1]))
+        Qs_out[-1] = Qs_in[-1] # Sediments can not stay on the last section.
+        z_new = state.z + (Qs_in-Qs_out)*dt/S
+        state.z[:] = np.maximum(z_new, state.z_min) # rounding errors only, when a section is emptied
+        return Qs_out[-1]
+
+    def compute_event(self, hydrogram, t_hydrogram, law, sedimentogram=None, backup=False, debug=False, method="ImprovedEuler", friction_law="Ferguson", cfl=1, critical=False, upstream_condition="normal_depth", downstream_condition="normal_depth", plot=False, writer=None, telemetry=None, checkpoint=None, checkpoint_period=600, resume=False, multirate=False, hydraulic_Q_rtol=0.02, hydraulic_z_tol=0.01, hydraulic_max_skip=20, morpho_cfl=0.5, dt_max=None):
         """
         main function of the class : compute an entire event and return the evolution of the profile
+        If a ResultWriter is given, the evolution is written step by step by the writer instead of being kept in memory,
+        and the matrices of the result are read-only memory maps of the written files.
+        If a checkpoint path is given, the state of the computation is saved there every checkpoint_period seconds of computation
+        (the file is removed at the end of the event). With resume=True, the computation starts again from this checkpoint.
+        The envelope of the event (see Envelope) is computed online, on every step even if the writer keeps only some of them.
+        If a Telemetry is given, it logs the work of the solver on every step (time step, sweeps, root finders, mass balance...).
+        multirate=True separates hydraulic and sediment time scales :
+            - the water depth is computed again only when Q has changed by more than hydraulic_Q_rtol (relative), the bottom by more
+              than hydraulic_z_tol (m) since the last computation, or after hydraulic_max_skip steps. Else the last depth is used.
+            - the time step can be longer than the water velocity one (cfl) if the bed evolves slowly : the bottom of a section
+              may not move more than morpho_cfl*hydraulic_z_tol in one step. This time step can not be more than twice the previous
+              one, nor more than dt_max (the smallest time step of the hydrogram by default).
+          On a 60 sections demo profile, the default values compute the water depth on 220 of 294 steps for a 600s event (309 without
+          multirate) and on 298 of 638 steps for a 3600s event (1080 without multirate). hydraulic_Q_rtol=0.05, hydraulic_z_tol=0.02 and
+          hydraulic_max_skip=50 go down to 149 and 184 computations, with bed envelopes differing by about 3cm and 10cm (for 2m of bed evolution).
+          The gain is limited by the bed itself : it moves of more than hydraulic_z_tol in a few cfl steps when the transport is strong.
         """
         start_computation = time()
+        state = self.get_state()
         y_matrix = [] # list of the water depth during the event
-        z_matrix = [self.get_z_list()] # list of the bottom height during the event
         h_matrix = [] # list of head during the event
         V_in = 0 # solid volume gone into the profile during the event
         V_out = 0 # solid volume gone out of the profile
@@ -303,110 +448,211 @@ class Profile():
         t_list = [] # list of the t time of each step of the commputation
         dt_list = [] # list of the time steps used at each iteration
         t = t_hydrogram[0]
-        t_list = [t]
+        nb_step = 0 # number of steps of time computed
+        next_t_print = 0
         stored_volume_start = self.get_stored_volume() # stored volume of sediment at the start of the event 
-        initial_profile = self.copy()
+        initial_profile = self.copy(share_geometry=True)
+        envelope = Envelope(state.get_nb_section())
+        dt = None # time step of the previous step
+        dt_morpho = None # time step given by the bed evolution (multirate only)
+        y_list = None
+        nb_skip = 0 # number of steps since the last hydraulic computation (multirate only)
+        if writer is not None:
+            writer.start(list(state.x[-1] - state.x))
+        if telemetry is not None:
+            telemetry.start(append=resume and checkpoint is not None and os.path.isfile(checkpoint))
+        if resume and checkpoint is not None:
+            if os.path.isfile(checkpoint):
+                saved = Checkpoint.load(checkpoint)
+                if saved["nb_section"] != state.get_nb_section() or saved["t_end"] != t_hydrogram[-1]:
+                    raise(ValueError(f"the checkpoint {checkpoint} does not match this profile and hydrogram"))
+                t, nb_step, next_t_print = saved["t"], saved["nb_step"], saved["next_t_print"]
+                V_in, V_out, stored_volume_start = saved["V_in"], saved["V_out"], saved["stored_volume_start"]
+                dt, dt_morpho = [None if value != value else value for value in (saved.get("dt", np.nan), saved.get("dt_morpho", np.nan))] # nan : None
+                state.z[:] = saved["z"]
+                envelope.restore(saved)
+                if "y_hydraulic" in saved: # last hydraulic computation, still used by the next steps (multirate only)
+                    y_list, Q_hydraulic, z_hydraulic, nb_skip = list(saved["y_hydraulic"]), saved["Q_hydraulic"], saved["z_hydraulic"], saved["nb_skip"]
+                if writer is None:
+                    print("WARNING : results computed before the checkpoint are not kept in memory, use a ResultWriter to keep them")
+                else:
+                    writer.restore(saved)
+                print(f"INFO : computation resumed from {checkpoint} at t={t:.3f}s")
+            else:
+                print(f"WARNING : no checkpoint found ({checkpoint}), the event starts from the beginning")
+        z_matrix = [state.z.copy()] if writer is None else [] # list of the bottom height during the event
+        t_list = [t]
+        last_checkpoint = time()
         method_set = {"Euler", "ImprovedEuler", "RungeKutta"}
         if not(method in method_set):
             print(f"WARNING : chosen method not in the available list : {method_set}, it has been set by default on ImprovedEuler")
             method = "ImprovedEuler"
-        log_string = f"[backup={backup}, debug={debug}, method={method}, friction_law={friction_law}, speed_coef={cfl}, critical={critical}]"
+        log_string = f"[backup={backup}, debug={debug}, method={method}, friction_law={friction_law}, speed_coef={cfl}, critical={critical}, multirate={multirate}]"
+        if multirate and dt_max is None:
+            dt_max = np.min(np.diff(t_hydrogram))
+        nb_hydraulic = 0 # number of hydraulic computations
+        dt_limiter_count = np.zeros(state.get_nb_section()-1, dtype=np.int64) # number of times each reach has imposed the cfl time step
         if debug:
-            profile_list = [initial_profile]
+            snapshot_list = [initial_profile.snapshot()] # state of the profile at each step, see restore
             current_stored_volume = stored_volume_start
             total_volume_difference = [] 
             one_step_volume_difference = []
 
-        next_t_print = 0
-        while t <= t_hydrogram[-1]:
-            Q = np.interp(t, t_hydrogram, hydrogram)
-            Q_list.append(Q)
-
-            # hydraulic computations
-            try:
-                if critical:
-                    y_list = self.get_yc_list(Q)
-                else:
-                    y_list = self.compute_depth(Q, method=method, friction_law=friction_law, upstream_condition="normal_depth", downstream_condition="normal_depth")
-            except Exception as e:
-                print("ERROR IN COMPUTING THIS EVENT : COULD NOT FINISH\n plotting the last state ...\n")
-                raise(e)
+        depth_cache_enabled = DepthCache.enabled
+        DepthCache.enabled = False # Q changes on every step : the cache of critical and normal depths would never hit
+        try:
+            while t <= t_hydrogram[-1]:
+                time_0 = perf_counter()
+                Q = np.interp(t, t_hydrogram, hydrogram)
+                Q_list.append(Q)
+
+                # hydraulic computations
+                skip_hydraulic = multirate and y_list is not None and nb_skip+1 < hydraulic_max_skip and abs(Q-Q_hydraulic) <= hydraulic_Q_rtol*Q_hydraulic and np.max(np.abs(state.z-z_hydraulic)) <= hydraulic_z_tol
                 try:
-                    self.plot(Q=Q, y=y_list, friction_law=friction_law)
-                except Exception:
-                    pass
-                plt.show()
-                break
-
-            y_matrix.append(y_list)
-            h_matrix.append([s.get_H(Q, y_list[i]) for i, s in enumerate(self.__section_list)])
-            dt = self.find_best_dt(Q, y_list, cfl=cfl)
-            # t_aux = list(np.sort(abs(np.array(t_hydrogram) - t)))
-            # dt_hydrogram = t_aux[1] + t_aux[0]
-            # print(f"dt_opti={dt_opti:.3f}, dt_hydrogram={dt_hydrogram:.3f}")
-            # dt = min(dt_hydrogram, dt_opti)
-            if t >= next_t_print: 
-                print(f"{t:.3f}/{t_hydrogram[-1]} (dt={dt:.3f}s) "+log_string)
-                print(f"current_computation_time = {time_to_string(time()-start_computation)}")
-                next_t_print += (t_hydrogram[-1]/10)
-           
-            # solid transport
-            if sedimentogram == None:
-                QsIn0 = law.compute_Qs(initial_profile.get_upstream_section(), Q, y_list[0], y_list[1]) # Gonna change, it is a given parameter, chosen by users
-            else:
-                QsIn0 = np.interp(t, t_hydrogram, sedimentogram)
-            V_in += QsIn0*dt
-            QsOut = self.update_bottom(Q, y_list, QsIn0, dt, law, friction_law=friction_law)
-            V_out += QsOut*dt
-            z_matrix.append(self.get_z_list())
-
-            t += dt
-            dt_list.append(dt)
-            t_list.append(t)
-            # debug
-            if debug:
-                total_volume_difference.append(V_in - V_out - (self.get_stored_volume() - stored_volume_start))
-                one_step_volume_difference.append(QsIn0*dt - QsOut*dt - (self.get_stored_volume() - current_stored_volume))
-                current_stored_volume = self.get_stored_volume()
-                if abs(one_step_volume_difference[-1]) > 0.1:
-                    print(f"WARNING : HUGE SEDIMENT CREATION/DISAPPEARANCE ON THE STEP OF TIME i={i}")
-                profile_list.append(self.copy())
-
-        try:       
-            Q = np.interp(t, t_hydrogram, hydrogram)
-            Q_list.append(Q)
-            y_matrix.append(self.get_yc_list(Q) if critical else self.compute_depth(hydrogram[-1]))
-            h_matrix.append([s.get_H(Q, y_matrix[-1][i]) for i, s in enumerate(self.get_section_list())])
-        except Exception:
-            pass
+                    if skip_hydraulic:
+                        nb_skip += 1
+                    else:
+                        if critical:
+                            y_list = self.get_yc_list(Q)
+                        else:
+                            y_list = self.compute_depth(Q, method=method, friction_law=friction_law, upstream_condition="normal_depth", downstream_condition="normal_depth")
+                        nb_hydraulic += 1
+                        nb_skip = 0
+                        Q_hydraulic = Q
+                        z_hydraulic = state.z.copy()
+                except Exception as e:
+                    print("ERROR IN COMPUTING THIS EVENT : COULD NOT FINISH\n plotting the last state ...\n")
+                    raise(e)
+                time_1 = perf_counter()
+
+                H_list = self.get_H_list(Q, y_list)
+                envelope.update(t, y_list, state.z, H_list)
+                if writer is None:
+                    y_matrix.append(y_list)
+                    h_matrix.append(H_list)
+                else:
+                    writer.write(t, Q, y_list, state.z, H_list)
+                time_2 = perf_counter()
+                dt_previous = dt
+                dt, limiter_index, limiter_v, limiter_dx = self.get_dt_limiter(Q, y_list, cfl=cfl)
+                dt_cfl = dt
+                dt_limiter_count[limiter_index] += 1
+                if multirate and dt_morpho is not None and dt_previous is not None:
+                    dt = max(dt, min(dt_morpho, 2*dt_previous, dt_max)) # the water velocity time step is the smallest one
+                # t_aux = list(np.sort(abs(np.array(t_hydrogram) - t)))
+                # dt_hydrogram = t_aux[1] + t_aux[0]
+                # print(f"dt_opti={dt_opti:.3f}, dt_hydrogram={dt_hydrogram:.3f}")
+                # dt = min(dt_hydrogram, dt_opti)
+                if t >= next_t_print: 
+                    print(f"{t:.3f}/{t_hydrogram[-1]} (dt={dt:.3f}s, limited by the reach {limiter_index} : x={state.x[limiter_index]:.2f}, v={limiter_v:.3f}m/s, dx={limiter_dx:.3f}m) "+log_string)
+                    print(f"current_computation_time = {time_to_string(time()-start_computation)}")
+                    next_t_print += (t_hydrogram[-1]/10)
+                time_3 = perf_counter()
+
+                # solid transport
+                if telemetry is not None:
+                    stored_volume_before = self.get_stored_volume()
+                if sedimentogram is None:
+                    QsIn0 = law.compute_Qs(initial_profile.get_upstream_section(), Q, y_list[0], y_list[1]) # Gonna change, it is a given parameter, chosen by users
+                else:
+                    QsIn0 = np.interp(t, t_hydrogram, sedimentogram)
+                V_in += QsIn0*dt
+                if multirate:
+                    z_before = state.z.copy()
+                QsOut = self.update_bottom(Q, y_list, QsIn0, dt, law, friction_law=friction_law)
+                V_out += QsOut*dt
+                if multirate:
+                    dz_max = np.max(np.abs(state.z - z_before))
+                    dt_morpho = morpho_cfl*hydraulic_z_tol*dt/dz_max if dz_max > 0 else dt_max
+                if writer is None:
+                    z_matrix.append(state.z.copy())
+                time_4 = perf_counter()
+                if telemetry is not None:
+                    mass_error = (QsIn0 - QsOut)*dt - (self.get_stored_volume() - stored_volume_before)
+                    hydraulic_jump = 0 if critical or self.__hydraulic_index is None else len(self.__hydraulic_index)
+                    telemetry.record(step=nb_step, t=t, Q=Q, dt=dt, dt_cfl=dt_cfl, limiter=limiter_index, hydraulic=not(skip_hydraulic), hydraulic_jump=hydraulic_jump, mass_error=mass_error,
+                                     time_hydraulic=time_1-time_0, time_dt=time_3-time_2, time_sediment=time_4-time_3, time_output=time_2-time_1)
+
+                t += dt
+                nb_step += 1
+                dt_list.append(dt)
+                t_list.append(t)
+                if checkpoint is not None and time() - last_checkpoint >= checkpoint_period:
+                    writer_checkpoint = dict() if writer is None else writer.get_checkpoint()
+                    hydraulic_checkpoint = dict(y_hydraulic=y_list, Q_hydraulic=Q_hydraulic, z_hydraulic=z_hydraulic, nb_skip=nb_skip) if multirate else dict()
+                    if telemetry is not None:
+                        telemetry.flush()
+                    Checkpoint.save(checkpoint, t=t, z=state.z, V_in=V_in, V_out=V_out, stored_volume_start=stored_volume_start, nb_step=nb_step, dt=np.nan if dt is None else dt, dt_morpho=np.nan if dt_morpho is None else dt_morpho, next_t_print=next_t_print, t_end=t_hydrogram[-1], nb_section=state.get_nb_section(), **writer_checkpoint, **hydraulic_checkpoint, **envelope.get_checkpoint())
+                    last_checkpoint = time()
+                # debug
+                if debug:
+                    total_volume_difference.append(V_in - V_out - (self.get_stored_volume() - stored_volume_start))
+                    one_step_volume_difference.append(QsIn0*dt - QsOut*dt - (self.get_stored_volume() - current_stored_volume))
+                    current_stored_volume = self.get_stored_volume()
+                    if abs(one_step_volume_difference[-1]) > 0.1:
+                        print(f"WARNING : HUGE SEDIMENT CREATION/DISAPPEARANCE ON THE STEP OF TIME i={nb_step}")
+                    snapshot_list.append(self.snapshot())
+
+            try:       
+                Q = np.interp(t, t_hydrogram, hydrogram)
+                Q_list.append(Q)
+                y_list = self.get_yc_list(Q) if critical else self.compute_depth(hydrogram[-1])
+                H_list = self.get_H_list(Q, y_list)
+                envelope.update(t, y_list, state.z, H_list)
+                if writer is None:
+                    y_matrix.append(y_list)
+                    h_matrix.append(H_list)
+                else:
+                    writer.write(t, Q, y_list, state.z, H_list, force=True)
+            except Exception:
+                pass
+        finally:
+            DepthCache.enabled = depth_cache_enabled
+            if telemetry is not None:
+                telemetry.close() # the steps computed are kept, even if the event is interrupted
+        if checkpoint is not None:
+            Checkpoint.remove(checkpoint)
+        if writer is not None:
+            written = writer.close()
+            Q_list, t_list, y_matrix, z_matrix, h_matrix = written["Q"], written["t"], written["y"], written["z"], written["H"]
         stored_volume_end = self.get_stored_volume()
         end_computation = time()
         print(f"computation time = {end_computation-start_computation}s")
-        x = self.get_x_list()
-        x_max = max(x)
-        x = [x_max-xi for xi in x]
+        print(f"hydraulic computations : {nb_hydraulic} for {nb_step} steps of time")
+        if dt_limiter_count.sum() > 0:
+            i_max = int(np.argmax(dt_limiter_count))
+            print(f"reach imposing the cfl time step the most often : {i_max} (x={state.x[i_max]:.2f}, dx={state.get_dx()[i_max]:.3f}m), {100*dt_limiter_count[i_max]/dt_limiter_count.sum():.1f}% of the steps")
+        x = list(state.x[-1] - state.x)
+        result = dict()
+        result["abscissa"] = x
+        result["animation"] = None
+        result["water_depth"] = y_matrix
+        result["bottom_height"] = z_matrix
+        result["time"] = t_list
+        result["energy"] = h_matrix
+        result["water_discharge"] = Q_list
+        result["envelope"] = envelope
+        result["volume_in"] = V_in
+        result["volume_out"] = V_out
+        result["stored_volume"] = stored_volume_end - stored_volume_start
+        result["computation_time"] = end_computation - start_computation
+        result["nb_hydraulic_computation"] = nb_hydraulic
+        result["dt_limiter_count"] = dt_limiter_count
+        result["minimal_height"] = state.z_min.copy()
+        if self.has_only_rectangular_section():
+            result["width"] = state.b.copy()
         if not(plot):
-            return None
+            return result
 
         title = 'Sediment transport :\n' + \
             f'Volume gone in :  {V_in}\n' + \
             f'Volume gone out : {V_out}\n' + \
             f'Stored volume : {stored_volume_end - stored_volume_start}\n' + \
             f'Sum : {V_in - V_out - (stored_volume_end - stored_volume_start)}'
-        fig0, axs = plt.subplots(2)
-        fig0.suptitle(title)
-        axs[0].plot(x, z_matrix[0], color="r", label="z start")
-        axs[0].plot(x, z_matrix[-1], "orange", label="z end")
-        axs[0].plot(x, self.get_z_min_list(), "g--", marker="x", label="zmin")
-        axs[0].set(xlabel="x", ylabel="height (m)")
-        # axs[0].plot(x, [s.get_H(Q, y_matrix[-1][i]) for i, s in enumerate(self.__section_list)], label="Energy grade line")
-        axs[1].plot(x, np.array(z_matrix[-1])-np.array(z_matrix[0]), "b", label="newz-z")
-        axs[1].annotate(f"event of {time_to_string(t)}\ndt $\in$ [{min(dt_list):.3f}s, {max(dt_list):.3f}s]\nQmax = {max(hydrogram):.3f}m3/s\nQmean = {np.mean(hydrogram):.3f}m3/s\nfriction law = {'critical' if critical else friction_law}\nsediment transport law = {str(law)}\ntime of computation = {time_to_string(end_computation-start_computation)}", (self.get_x_min(), axs[1].get_ylim()[0]))
-        axs[1].set(xlabel="x", ylabel="difference of height (m)")
-        self.__plot_width_background(axs[0])
-        self.__plot_width_background(axs[1])
-        fig0.legend(loc='lower right')
-        fig0.set_size_inches(10.5, 9.5)
+        import matplotlib.pyplot as plt # plots are only imported on demand (headless runs never use them)
+        from src.render import Render
+        fig0, axs = Render.plot_summary(result, text=title)
+        axs[1].annotate(f"event of {time_to_string(t)}\ndt $\in$ [{min(dt_list):.3f}s, {max(dt_list):.3f}s]\nQmax = {max(hydrogram):.3f}m3/s\nQmean = {np.mean(hydrogram):.3f}m3/s\nfriction law = {'critical' if critical else friction_law}\nsediment transport law = {str(law)}\ntime of computation = {time_to_string(end_computation-start_computation)}", (min(x), axs[1].get_ylim()[0]))
         if backup:
             print("saving result plot...")
             fig0.savefig("./result.png", dpi=400, format="png")
@@ -419,41 +665,11 @@ class Profile():
             plt.legend()
             plt.title('sediment creation or diseppearance due to numerical errors')
 
-        fig, ax1 = plt.subplots() 
-        line, = ax1.plot(x, np.array(y_matrix[0])+np.array(z_matrix[0]), label="water line")
-        ax1.set_ylabel("height (m)")
-        annotation = ax1.annotate(f"Q={hydrogram[0]}", ((self.get_x_max()-self.get_x_min())*0.7+self.get_x_min(), min(self.get_z_min_list())))
-        ax1.plot(x, z_matrix[0], "r", label="z at the begining")
-        # ax1.vlines(200, 180, 210)
-        line2, = ax1.plot(x, z_matrix[0], "orange", label="z")
-        ax1.plot(x, self.get_z_min_list(), "g--", marker="x", label="zmin")
-        line3, = ax1.plot(x, h_matrix[0], color="pink", label="energy grade line")
-        ax1.set_ylim(min(self.get_z_min_list()), get_matrix_max(z_matrix)+get_matrix_max(y_matrix)) 
-
-        plt.xlim(self.get_x_min(), self.get_x_max())
-        plt.xlabel("x")
-        ax1.set_title("Water depth and bottom evolution")
-        fig.set_size_inches(9.5, 5.5)
-        self.__plot_width_background(ax1)
-        plt.legend()
-        def animate(i): 
-            y = y_matrix[i%(len(y_matrix))]
-            z = z_matrix[i%(len(y_matrix))] # y_matrix because in case of error, there is one more element in z_matrix and we need y and z to be synchronized
-            h = h_matrix[i%(len(y_matrix))] # len(y_matrix) = len(h_matrix) so whatever 
-            annotation.set_text(f"Q={Q_list[i%(len(y_matrix))]:.2f}\n {(i%(len(y_matrix)))*100/(len(y_matrix)):.1f}%\n t={t_list[i%len(y_matrix)]:.3f}/{t_list[-1]:.3f}\n")
-            line.set_data(x, np.array(y)+np.array(z))
-            line2.set_data(x, z)
-            line3.set_data(x, h)
-            return line, line2, line3, annotation, 
-        time_ani = 60 # seconds
-        nb_frames = 1000 
-        frames=(range(len(y_matrix)) if len(y_matrix)<nb_frames else range(0, len(y_matrix), len(y_matrix)//nb_frames))
-        ani = animation.FuncAnimation(fig, animate, frames=frames, interval=time_ani*1000/len(y_matrix), repeat=True, repeat_delay=3000)
+        fig, ani = Render.animate(result)
         if backup:
             print("saving animation...")
-            print(f"number of frames : {len(frames)}")
             t0 = time()
-            ani.save("./animation.mp4", fps=len(frames)/time_ani, dpi=150)
+            ani.save("./animation.mp4", dpi=150) # fps given by the interval of the animation
             print(f"animation saved ({time()-t0}).")
         if debug:
             print("[DEBUG] STARTING DEBUG")
@@ -465,9 +681,10 @@ class Profile():
             else:
                 plt.close()
             while input("[DEBUG] write \"stop\" to leave the debug loop, else please press ENTER : ") != "stop":
-                index = (int(input(f"[DEBUG]\t CHOOSE THE INDEX (<{len(profile_list)}) : ")))%(len(profile_list))
-                test_profile = profile_list[index]
-                if index == len(profile_list)-1:
+                index = (int(input(f"[DEBUG]\t CHOOSE THE INDEX (<{len(snapshot_list)}) : ")))%(len(snapshot_list))
+                test_profile = initial_profile.copy(share_geometry=True)
+                test_profile.restore(snapshot_list[index])
+                if index == len(snapshot_list)-1:
                     print("[DEBUG] \t\t\t last profile chosen.")
                     test_profile.plot()
                     plt.show()
@@ -491,14 +708,7 @@ class Profile():
                     test_profile.export(filename)
                     print("[DEBUG] profile saved.")
 
-        result = dict()
-        result["abscissa"] = x
         result["animation"] = ani
-        result["water_depth"] = y_matrix
-        result["bottom_height"] = z_matrix
-        result["time"] = t_list
-        result["energy"] = h_matrix
-
         return result
 
     # getters and setters
@@ -525,7 +735,7 @@ class Profile():
         """
         Return the list of height above the datum.
         """
-        return [section.get_z() for section in self.__section_list]
+        return self.__state.z.tolist()
 
     def get_yc_list(self, Q):
         return [section.get_yc(Q) for section in self.__section_list]        
@@ -546,6 +756,22 @@ class Profile():
         for i, section in enumerate(self.__section_list):
             section.set_z(z_list[i])
 
+    def get_H_list(self, Q, y_list):
+        """
+        Return the list of total head for the water depth y_list.
+        """
+        if self.__state.is_prismatic():
+            return list(self.__state.get_H(Q, np.asarray(y_list)))
+        return [s.get_H(Q, y_list[i]) for i, s in enumerate(self.__section_list)]
+
+    def get_V_list(self, Q, y_list):
+        """
+        Return the array of mean flow velocity for the water depth y_list.
+        """
+        if self.__state.is_prismatic():
+            return self.__state.get_V(Q, np.asarray(y_list, dtype=np.float64))
+        return np.array([s.get_V(Q, y_list[i]) for i, s in enumerate(self.__section_list)], dtype=np.float64)
+
     def get_nb_section(self):
         return len(self.__section_list)
 
@@ -558,6 +784,12 @@ class Profile():
     def get_section_list(self):
         return self.__section_list
 
+    def get_state(self):
+        """
+        Return the array-backed state of the profile (see ProfileState), built from the section list.
+        """
+        return self.__state
+
     def get_upstream_section(self):
         return self.__upstream
 
@@ -568,12 +800,20 @@ class Profile():
         """
         Compute the potential amount of solid stored in the profile.
         """
+        if self.__state.is_rectangular():
+            return self.__state.get_stored_volume()
         s = 0
         section_list = self.__section_list
         for section in section_list:
             s += section.get_stored_volume()
         return s
 
+    def get_hydraulic_jump_index(self):
+        """
+        Return the indexes of the sections followed by a hydraulic jump in the last compute_depth (empty list if nothing computed yet).
+        """
+        return [] if self.__hydraulic_index == None else self.__hydraulic_index[:]
+
     def get_upstream_boundary_condition(self, Q, friction_law="Ferguson", upstream_condition="normal_depth"):
         s = self.get_upstream_section()
         s0 = s.get_S0(up_direction=False)
@@ -603,10 +843,11 @@ class Profile():
     # computational stuff
 
     @Performance.measure_perf
-    def __compute_next_y(self, Q, current_section, next_section, current_y, current_hs, next_yc, supercritical, method="ImprovedEuler", friction_law="Ferguson"):
+    def __compute_next_y(self, Q, current_section, next_section, current_y, current_hs, next_yc, reach, supercritical, method="ImprovedEuler", friction_law="Ferguson"):
         """
         private methods only used in compute_depth for computing at each step the new specific head thanks to Euler methods.
         method can be "Euler", "ImprovedEuler" or "RungeKutta". 
+        reach = (z_current, z_next, S0) : elevations of both sections and slope of the bottom between them (read in ProfileState)
         """
         # return next_yc
         if method=="RungeKutta":
@@ -647,11 +888,9 @@ class Profile():
             x_current = current_section.get_x()
             dx = x_next - x_current
             hsc_next = next_section.get_Hs(Q, next_yc)
-            z_next = next_section.get_z()
-            z_current = current_section.get_z()
+            z_current, z_next, S0 = reach
 
-            up_direction = dx < 0
-            s1 = current_section.get_S0(up_direction=up_direction) - current_section.get_Sf(Q, current_y, friction_law=friction_law)
+            s1 = S0 - current_section.get_Sf(Q, current_y, friction_law=friction_law)
             hs_next = current_hs + dx*s1
             if (hs_next + z_next - (current_hs + z_current))*dx > 0:
                 hs_next = current_hs + z_current - z_next
@@ -662,7 +901,7 @@ class Profile():
                 next_y = next_section.get_y_from_Hs(Q, hs_next, supercritical=supercritical, yc=next_yc)
             if method=="Euler":
                 return next_y
-            s2 = next_section.get_S0(up_direction=not(up_direction)) - next_section.get_Sf(Q, next_y, friction_law=friction_law)
+            s2 = S0 - next_section.get_Sf(Q, next_y, friction_law=friction_law)
             hs_next = current_hs+ 0.5*(s1+s2)*dx
             if (hs_next + z_next - (current_hs + z_current))*dx > 0:
                 hs_next = current_hs + z_current - z_next
@@ -674,6 +913,7 @@ class Profile():
     # plot methods
 
     def plot(self, y=None, Q=None, title=None, compare=None, friction_law="Ferguson", background=False):
+        import matplotlib.pyplot as plt
         fig, ax1 = plt.subplots()
         x = self.get_x_list()
         x_maxi = max(x)
@@ -764,6 +1004,8 @@ class Profile():
         except TypeError:
             pass
 
+        import matplotlib.pyplot as plt
+        from mpl_toolkits.mplot3d import Axes3D # registers the 3d projection
         fig = plt.figure()
         ax = fig.add_subplot(projection="3d")
         data1 = [[], [], []]
@@ -0,0 +1,144 @@
+import numpy as np
+
+from src.granulometry import Granulometry
+from src.utils import G
+
+GRANULOMETRY_FIELDS = ("dm", "d30", "d50", "d90", "d84tb", "d84bs", "Gr")
+
+
+class ProfileState:
+    """
+    Structure-of-arrays image of a profile : every section attribute used in the time loop is stored in a contiguous float64 array
+    (index i of each array is the i-th section of the profile, sorted by x ascending).
+    The state is the reference for the bed elevation : the sections of the profile read and write their z in the array z
+    (see IrregularSection.set_state), so nothing has to be synchronized during an event. The other arrays are built from the sections,
+    which stay the reference for the geometry description, plots and inputs/outputs.
+    Missing values (manning not given, incomplete granulometry, width of an irregular section...) are stored as nan.
+    """
+
+    def __init__(self, x, z, z_min, b, s, y_max, manning, granulometry_list, rectangular=False, prismatic=False):
+        self.x = np.array(x, dtype=np.float64)
+        self.z = np.array(z, dtype=np.float64)
+        self.z_min = np.array(z_min, dtype=np.float64)
+        self.b = np.array(b, dtype=np.float64)
+        self.s = np.array(s, dtype=np.float64)
+        self.y_max = np.array(y_max, dtype=np.float64)
+        self.manning = np.array(manning, dtype=np.float64)
+        self.granulometry_list = list(granulometry_list)
+        self.granulometry = Granulometry(**{name: np.array([ProfileState.__to_float(getattr(g, name, None)) for g in self.granulometry_list], dtype=np.float64) for name in GRANULOMETRY_FIELDS})
+        self.d84bs = self.granulometry.d84bs
+        self.__rectangular = rectangular
+        self.__prismatic = prismatic
+        self.__dx = None
+        self.__bed_area = None
+
+    @staticmethod
+    def from_section_list(section_list):
+        """build the state of a sorted and linked section list (see Profile.setup_section_list)"""
+        x, z, z_min, b, s, y_max, manning = [], [], [], [], [], [], []
+        for section in section_list:
+            x.append(section.get_x())
+            z.append(section.get_z())
+            z_min.append(section.get_z_min())
+            if section.is_prismatic():
+                b.append(section.get_b(0))
+                s.append(0 if section.is_rectangular() else section.get_s())
+            else:
+                b.append(np.nan)
+                s.append(np.nan)
+            y_max.append(section.get_y_max())
+            manning.append(ProfileState.__to_float(section.get_manning()))
+        rectangular = all(section.is_rectangular() for section in section_list)
+        prismatic = all(section.is_prismatic() for section in section_list)
+        return ProfileState(x, z, z_min, b, s, y_max, manning, [section.get_granulometry() for section in section_list], rectangular=rectangular, prismatic=prismatic)
+
+    def copy(self):
+        """return a safe copy of this state"""
+        return ProfileState(self.x, self.z, self.z_min, self.b, self.s, self.y_max, self.manning, self.granulometry_list, rectangular=self.__rectangular, prismatic=self.__prismatic)
+
+    def set_b(self, b):
+        """write the width array (the bed areas computed from the previous one are dropped)"""
+        self.b[:] = b
+        self.__bed_area = None
+
+    # getters
+
+    def get_nb_section(self):
+        return len(self.x)
+
+    def is_rectangular(self):
+        return self.__rectangular
+
+    def is_prismatic(self):
+        return self.__prismatic
+
+    def get_dx(self):
+        """distance between each section and its down section (length nb_section-1)"""
+        if self.__dx is None:
+            self.__dx = np.diff(self.x)
+        return self.__dx
+
+    def get_S0(self):
+        """slope of the bottom between each section and its down section (length nb_section-1), computed as IrregularSection.get_S0"""
+        return ((self.z[:-1]*1000 - self.z[1:]*1000)/self.get_dx())/1000
+
+    def get_bed_area(self):
+        """
+        horizontal area of bed associated to each section, as computed in RectangularSection.update_bottom and get_stored_volume.
+        """
+        if self.__bed_area is None:
+            dx = self.get_dx()
+            b = self.b
+            b_up = np.concatenate(([b[0]], b[:-1]))
+            b_down = np.concatenate((b[1:], [b[-1]]))
+            dx_up = np.concatenate(([dx[0]], dx))     # numerical convention for upstream and downstream section
+            dx_down = np.concatenate((dx, [dx[-1]]))
+            self.__bed_area = 0.5*((0.75*b+0.25*b_up)*dx_up+(0.75*b+0.25*b_down)*dx_down)
+        return self.__bed_area
+
+    def get_stored_volume(self):
+        """potential amount of solid stored in the profile (rectangular sections only)"""
+        return float(np.sum((self.z - self.z_min)*self.get_bed_area()))
+
+    # hydraulic quantities for prismatic profiles : y is the array of water depth of the sections selected by index (all by default)
+
+    def get_b(self, y, index=slice(None)):
+        return self.b[index] + 2*self.s[index]*y
+
+    def get_S(self, y, index=slice(None)):
+        return (self.b[index] + self.s[index]*y)*y
+
+    def get_P(self, y, index=slice(None)):
+        return self.b[index] + 2*y*np.sqrt(1+self.s[index]**2)
+
+    def get_R(self, y, index=slice(None)):
+        return self.get_S(y, index) / self.get_P(y, index)
+
+    def get_V(self, Q, y, index=slice(None)):
+        return Q / self.get_S(y, index)
+
+    def get_Hs(self, Q, y, index=slice(None)):
+        return y + (self.get_V(Q, y, index)**2)/(2*G)
+
+    def get_H(self, Q, y, index=slice(None)):
+        return self.z[index] + y + (self.get_V(Q, y, index)**2)/(2*G)
+
+    def get_Cf(self, Q, y, index=slice(None), friction_law="Ferguson"):
+        """dimensionless friction coefficient, see IrregularSection.get_Cf"""
+        if friction_law=="Manning-Strickler":
+            return (G*self.manning[index]**2) / (self.get_R(y, index)**(1/3))
+        elif friction_law=="Ferguson":
+            coef = self.get_R(y, index)/self.d84bs[index]
+            return (1+0.15*coef**(5/3)) / ((2.5*coef)**2)
+        else:
+            raise ValueError(f"unknown friction law : {friction_law}")
+
+    def get_Sf(self, Q, y, index=slice(None), friction_law="Ferguson"):
+        """slope of energy grade line, see IrregularSection.get_Sf"""
+        return (self.get_Cf(Q, y, index, friction_law=friction_law) * self.get_V(Q, y, index)**2) / (G*self.get_R(y, index))
+
+    # static methods
+
+    @staticmethod
+    def __to_float(value):
+        return np.nan if value is None else value
@@ -1,16 +1,24 @@
 from src.perf import Performance
-from src.utils import G, real_roots_cubic_function
+from src.telemetry import Telemetry
+from src.utils import G, Y_MIN, newton_y_from_Hs
 from src.irregularSection import IrregularSection
 import numpy as np
 
 class RectangularSection(IrregularSection):
 
+    __slots__ = ("__b", "__y_max", "__last_y")
+
     def __init__(self, x, z, b, z_min=None, y_max=None , up_section=None, down_section=None, granulometry=None, manning=0.013, K_over_tauc=None, tauc_over_rho=None):
         self.__b = b
         self.__y_max = 1000 if y_max==None or y_max <= 0 else y_max # MAX_INT
-        points = [(0, self.__y_max), (0,0), (b, 0), (b, self.__y_max)]
-        super().__init__(points, x, z, z_min=z_min, up_section=up_section, down_section=down_section, granulometry=granulometry, manning=manning, K_over_tauc=K_over_tauc, tauc_over_rho=tauc_over_rho)
+        self.__last_y = [None, None] # last solutions of get_y_from_Hs (subcritical, supercritical), used as initial guesses
+        super().__init__(None, x, z, z_min=z_min, up_section=up_section, down_section=down_section, granulometry=granulometry, manning=manning, K_over_tauc=K_over_tauc, tauc_over_rho=tauc_over_rho)
         
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        if not("_RectangularSection__last_y" in state): # profile exported by an older version
+            self.__last_y = [None, None]
+
     def interp_as_up_section(self, other_section, x=None):
         interpolated_section = super().interp(self, other_section, x=x)
         if x==None:
@@ -25,6 +33,19 @@ class RectangularSection(IrregularSection):
         interpolated_section.__b = np.interp(x, [other_section.get_x(), self.get_x()], [other_section.get_b(), self.get_b()])       
         return interpolated_section
 
+    def interp_list_as_up_section(self, other_section, x_list):
+        section_list = super().interp_list_as_up_section(other_section, x_list)
+        b_array = np.interp(x_list, [self.get_x(), other_section.get_x()], [self.get_b(), other_section.get_b()])
+        for section, b in zip(section_list, b_array):
+            section.__b = b
+            section.__last_y = [None, None]
+        return section_list
+
+    def light_copy(self):
+        section = super().light_copy()
+        section.__last_y = [None, None]
+        return section
+
     def copy(self):
         """return a safe copy of this section"""
         return RectangularSection(self.get_x(), self.get_z(), self.get_b(), z_min=self.get_z_min(), up_section=self.get_up_section(), down_section=self.get_down_section(), granulometry=self.get_granulometry(), manning=self.get_manning())
@@ -85,14 +106,18 @@ class RectangularSection(IrregularSection):
 
     # getters and setters
 
-    @Performance.measure_perf
+    def build_points(self):
+        return [(0, self.__y_max), (0,0), (self.__b, 0), (self.__b, self.__y_max)]
+
+    def get_y_max(self):
+        return self.__y_max
+
     def get_wet_section(self, y):
-        points = self.get_points()    
-        if y >= self.get_y_max():
+        """only used for plots : hydraulic quantities are given by direct formulas"""
+        if y >= self.__y_max:
             print("WARNING : Water depth has gone upper than the maximum one")
-            return points
-        else:
-            return [(0, y)] + points[1:-1] + [(self.__b, y)]
+            return self.build_points()
+        return [(0, y), (0, 0), (self.__b, 0), (self.__b, y)]
 
     def get_b(self, y=0, wet_points=None):
         """
@@ -100,6 +125,9 @@ class RectangularSection(IrregularSection):
         """
         return self.__b
 
+    def get_geometry_key(self):
+        return self.__b
+
     def set_b(self, b):
         if b <= 0:
             raise ValueError("width b can not be lower than 0")
@@ -148,13 +176,22 @@ class RectangularSection(IrregularSection):
     def get_yc(self, Q):
         return (Q**2 / (G*self.__b**2))**(1/3)
     
-    # @Performance.measure_perf
-    # def get_y_from_Hs(self, Q, Hs, supercritical, yc=None):
-    #     positive_real_roots = real_roots_cubic_function(1, -Hs, 0, Q**2 / (2*G*self.get_b()**2))
-    #     if supercritical:
-    #         return min(positive_real_roots)
-    #     else:
-    #         return max(positive_real_roots)
+    @Performance.measure_perf
+    def get_y_from_Hs(self, Q, Hs, supercritical, yc=None):
+        """
+        Same as IrregularSection.get_y_from_Hs, solved by a safeguarded Newton method warm-started on the previous solution.
+        brentq is only used if this method fails.
+        """
+        yc = yc if yc != None else self.get_yc(Q)
+        if supercritical:
+            y = newton_y_from_Hs(Q, Hs, self.__b, 0, Y_MIN, yc, y0=self.__last_y[1])
+        else:
+            y = newton_y_from_Hs(Q, Hs, self.__b, 0, yc, 0.999*self.get_y_max(), y0=self.__last_y[0])
+        if y == None:
+            Telemetry.count("newton_fallback")
+            return super().get_y_from_Hs(Q, Hs, supercritical, yc=yc)
+        self.__last_y[int(supercritical)] = y
+        return y
 
     # operators overloading
 
@@ -164,4 +201,7 @@ class RectangularSection(IrregularSection):
     # static methods
 
     def is_rectangular(self):
+        return True
+
+    def is_prismatic(self):
         return True
\ No newline at end of file
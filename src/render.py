@@ -0,0 +1,211 @@
+import os
+import shutil
+import subprocess
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from src.resultFile import ResultFile
+
+FRAME_NAME = "frame_{:05d}.png"
+
+class Render:
+    """
+    Plots and animation of the result of an event, separated from the computation : nothing here is imported by the solver.
+    render works on a result file (see ResultFile) : rows are read lazily, only the frames rendered are read, x can be decimated
+    for long reaches, frames are drawn in parallel by a pool of processes and assembled by ffmpeg (if it is installed).
+    plot_summary and animate work on the result dict of Profile.compute_event (or of ResultFile.load) for interactive use.
+    """
+
+    @staticmethod
+    def render(path, folder=None, nb_frame=300, duration=60, nb_x=2000, max_workers=None, dpi=150):
+        """
+        write the summary plot (result.png) and the animation (animation.mp4) of the result file path in folder (next to the
+        result file by default). nb_frame rows evenly spaced in time are rendered, on at most nb_x sections.
+        If ffmpeg is not found, the frames are kept as png files.
+        """
+        if folder is None:
+            folder = os.path.dirname(path)
+        frame_folder = os.path.join(folder, "frames")
+        os.makedirs(frame_folder, exist_ok=True)
+        result = ResultFile.load(path)
+        t = np.asarray(result["t"])
+        if len(t) == 0:
+            print("WARNING : nothing to render, the result file is empty")
+            return
+        row_index = Render.get_row_index(t, nb_frame)
+        column_index = Render.get_column_index(len(result["x"]), nb_x)
+        envelope = result["envelope"]
+        z_min = result["z_min"] if "z_min" in result else envelope.get_min("z")
+        limits = (float(np.min(z_min)), float(np.max(envelope.get_max("z")) + np.max(envelope.get_max("y"))))
+        Render.__save_summary(path, os.path.join(folder, "result.png"))
+
+        nb_worker = max(1, min(max_workers or os.cpu_count() or 1, len(row_index)))
+        job_list = [(path, frame_folder, list(enumerate(row_index))[k::nb_worker], column_index, limits, dpi) for k in range(nb_worker)]
+        if nb_worker == 1:
+            for job in job_list:
+                Render.render_frames(*job)
+        else:
+            with ProcessPoolExecutor(max_workers=nb_worker) as executor:
+                list(executor.map(Render.render_frames, *zip(*job_list)))
+        print(f"{len(row_index)} frames rendered in {frame_folder}")
+
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg is None:
+            print("WARNING : ffmpeg not found, the frames are kept as png files")
+            return
+        output = os.path.join(folder, "animation.mp4")
+        command = [ffmpeg, "-y", "-loglevel", "error", "-framerate", f"{max(len(row_index)/duration, 1):.3f}", "-i", os.path.join(frame_folder, "frame_%05d.png"),
+                   "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-pix_fmt", "yuv420p", output]
+        if subprocess.run(command).returncode != 0:
+            print("WARNING : ffmpeg failed, the frames are kept as png files")
+            return
+        shutil.rmtree(frame_folder)
+        print(f"animation saved in {output}")
+
+    @staticmethod
+    def render_frames(path, frame_folder, frame_list, column_index, limits, dpi=150):
+        """draw the frames [(frame number, row of the result file)] of frame_list in png files (run by the workers of render)"""
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        result = ResultFile.load(path)
+        x = np.asarray(result["x"])[column_index]
+        z_start = np.asarray(result["z"][0])[column_index]
+        fig, ax = plt.subplots()
+        fig.set_size_inches(9.5, 5.5)
+        line, = ax.plot(x, z_start, label="water line")
+        ax.plot(x, z_start, "r", label="z at the begining")
+        line2, = ax.plot(x, z_start, "orange", label="z")
+        if "z_min" in result:
+            ax.plot(x, np.asarray(result["z_min"])[column_index], "g--", label="zmin")
+        line3, = ax.plot(x, z_start, color="pink", label="energy grade line")
+        annotation = ax.annotate("", (0.7, 0.05), xycoords="axes fraction")
+        ax.set_xlim(np.min(x), np.max(x))
+        ax.set_ylim(*limits)
+        ax.set(xlabel="x", ylabel="height (m)", title="Water depth and bottom evolution")
+        ax.legend()
+        t_end = float(result["t"][-1])
+        for frame, row in frame_list:
+            z = np.asarray(result["z"][row])[column_index]
+            line.set_data(x, np.asarray(result["y"][row])[column_index] + z)
+            line2.set_data(x, z)
+            line3.set_data(x, np.asarray(result["H"][row])[column_index])
+            annotation.set_text(f"Q={float(result['Q'][row]):.2f}\n t={float(result['t'][row]):.3f}/{t_end:.3f}")
+            fig.savefig(os.path.join(frame_folder, FRAME_NAME.format(frame)), dpi=dpi)
+        plt.close(fig)
+
+    @staticmethod
+    def get_row_index(t, nb_frame):
+        """rows of the result to render : the first row at or after nb_frame times evenly spaced in the event (all rows if there are fewer)"""
+        t = np.asarray(t, dtype=np.float64)
+        if len(t) <= nb_frame:
+            return np.arange(len(t))
+        row_index = np.searchsorted(t, np.linspace(t[0], t[-1], nb_frame))
+        return np.unique(np.minimum(row_index, len(t)-1))
+
+    @staticmethod
+    def get_column_index(nb_section, nb_x):
+        """sections to draw : at most nb_x sections evenly spread, the first and the last ones included"""
+        if nb_section <= nb_x:
+            return np.arange(nb_section)
+        return np.unique(np.linspace(0, nb_section-1, nb_x).round().astype(int))
+
+    @staticmethod
+    def plot_summary(result, text=None):
+        """figure of the bottom at the start and at the end of the event and of its evolution (result of compute_event or ResultFile.load)"""
+        import matplotlib.pyplot as plt
+        x, z_start, z_end, z_min = Render.__get_summary_data(result)
+        fig, axs = plt.subplots(2)
+        if text is not None:
+            fig.suptitle(text)
+        axs[0].plot(x, z_start, color="r", label="z start")
+        axs[0].plot(x, z_end, "orange", label="z end")
+        if z_min is not None:
+            axs[0].plot(x, z_min, "g--", marker="x", label="zmin")
+        axs[0].set(xlabel="x", ylabel="height (m)")
+        axs[1].plot(x, z_end-z_start, "b", label="newz-z")
+        axs[1].set(xlabel="x", ylabel="difference of height (m)")
+        if "width" in result:
+            Render.plot_width_background(axs[0], x, result["width"])
+            Render.plot_width_background(axs[1], x, result["width"], label=False)
+        fig.legend(loc='lower right')
+        fig.set_size_inches(10.5, 9.5)
+        return fig, axs
+
+    @staticmethod
+    def animate(result, nb_frame=1000, nb_x=2000, duration=60):
+        """interactive animation (FuncAnimation) of the result of compute_event : keep a reference on it while it is shown"""
+        import matplotlib.pyplot as plt
+        import matplotlib.animation as animation
+        t_list = np.asarray(result["time"])
+        y_matrix, z_matrix, h_matrix = result["water_depth"], result["bottom_height"], result["energy"]
+        nb_row = len(y_matrix) # in case of error, there is one more element in z_matrix and we need y and z to be synchronized
+        row_index = Render.get_row_index(t_list[:nb_row], nb_frame)
+        column_index = Render.get_column_index(len(result["abscissa"]), nb_x)
+        x = np.asarray(result["abscissa"])[column_index]
+        z_start = np.asarray(z_matrix[0])[column_index]
+        fig, ax = plt.subplots()
+        line, = ax.plot(x, np.asarray(y_matrix[0])[column_index]+z_start, label="water line")
+        ax.plot(x, z_start, "r", label="z at the begining")
+        line2, = ax.plot(x, z_start, "orange", label="z")
+        z_min = np.asarray(result["minimal_height"])[column_index] if result.get("minimal_height") is not None else z_start
+        ax.plot(x, z_min, "g--", marker="x", label="zmin")
+        line3, = ax.plot(x, np.asarray(h_matrix[0])[column_index], color="pink", label="energy grade line")
+        annotation = ax.annotate("", (0.7, 0.05), xycoords="axes fraction")
+        envelope = result.get("envelope")
+        y_top = np.max(envelope.get_max("z")) + np.max(envelope.get_max("y")) if envelope is not None else np.max(z_start) + np.max(y_matrix[0])
+        ax.set_ylim(np.min(z_min), y_top)
+        ax.set_xlim(np.min(x), np.max(x))
+        ax.set(xlabel="x", ylabel="height (m)", title="Water depth and bottom evolution")
+        fig.set_size_inches(9.5, 5.5)
+        if "width" in result:
+            Render.plot_width_background(ax, x, np.asarray(result["width"])[column_index])
+        ax.legend()
+        Q_list = result["water_discharge"]
+        def update(i):
+            row = row_index[i]
+            z = np.asarray(z_matrix[row])[column_index]
+            line.set_data(x, np.asarray(y_matrix[row])[column_index]+z)
+            line2.set_data(x, z)
+            line3.set_data(x, np.asarray(h_matrix[row])[column_index])
+            annotation.set_text(f"Q={float(Q_list[row]):.2f}\n {row*100/nb_row:.1f}%\n t={t_list[row]:.3f}/{t_list[nb_row-1]:.3f}\n")
+            return line, line2, line3, annotation,
+        ani = animation.FuncAnimation(fig, update, frames=len(row_index), interval=duration*1000/len(row_index), repeat=True, repeat_delay=3000)
+        return fig, ani
+
+    @staticmethod
+    def plot_width_background(ax, x, b, label=True):
+        """grey transparent background whose darkness depends on the width b of the sections (prismatic profiles only, b is nan else)"""
+        b = np.asarray(b, dtype=np.float64)
+        if len(b) == 0 or np.any(np.isnan(b)):
+            return
+        b_max, b_min = np.max(b), np.min(b)
+        b_diff = b_max-b_min if b_max != b_min else 1
+        ymin, ymax = ax.get_ylim()
+        change = np.flatnonzero(b[1:] != b[:-1]) + 1
+        bound = np.concatenate([[x[0]], 0.5*(np.asarray(x)[change]+np.asarray(x)[change-1]), [x[-1]]])
+        labeled = set()
+        for k, start in enumerate(np.concatenate([[0], change])):
+            name = None if not(label) or b[start] in labeled or not(b[start] in (b_min, b_max)) else f"width = {b[start]:g}m"
+            labeled.add(b[start])
+            ax.fill_betweenx([ymin, ymax], bound[k], bound[k+1], color='grey', alpha=0.2+0.6*(b_max-b[start])/b_diff, label=name)
+
+    @staticmethod
+    def __get_summary_data(result):
+        if "abscissa" in result: # result of compute_event
+            nb_row = len(result["water_depth"])
+            z_min = result.get("minimal_height")
+            return np.asarray(result["abscissa"]), np.asarray(result["bottom_height"][0]), np.asarray(result["bottom_height"][nb_row-1]), z_min
+        return np.asarray(result["x"]), np.asarray(result["z"][0]), np.asarray(result["z"][-1]), result.get("z_min")
+
+    @staticmethod
+    def __save_summary(path, filename):
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        result = ResultFile.load(path)
+        if "b" in result:
+            result["width"] = result["b"]
+        fig, _ = Render.plot_summary(result, text=f"event of {float(result['t'][-1]):.0f}s")
+        fig.savefig(filename, dpi=200, format="png")
+        plt.close(fig)
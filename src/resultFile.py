@@ -0,0 +1,112 @@
+import os
+import json
+import struct
+import zipfile
+import numpy as np
+from numpy.lib import format as npy_format
+
+from src.envelope import Envelope
+from src.utils import write_datafile
+
+MATRIX_LIST = ("y", "z", "H")
+
+class ResultFile:
+    """
+    Single file container of the result of an event : an uncompressed .npz archive with the arrays x (abscissa), t (time),
+    Q (water discharge), y (water depth), z (bottom height), H (head), the envelope of the event (envelope_* arrays, see Envelope)
+    and the configuration of the run (config, json string). The minimal bottom height (z_min) and the width of the sections (b, rectangular
+    profiles only) are stored when the result gives them, they are used by Render.
+    As the archive is not compressed, load gives memory maps of its arrays : rows are only read when they are used.
+    """
+
+    @staticmethod
+    def save(path, args, result):
+        """write the result of Profile.compute_event (matrices can be lists, arrays or memory maps)"""
+        nb_row = len(result["water_depth"]) # t, Q and z may have one more element if the last depth computation failed
+        data = {
+            "x": np.asarray(result["abscissa"], dtype=np.float64),
+            "t": np.asarray(result["time"][:nb_row], dtype=np.float64),
+            "Q": np.asarray(result["water_discharge"][:nb_row], dtype=np.float64),
+            "y": np.asarray(result["water_depth"], dtype=np.float64),
+            "z": np.asarray(result["bottom_height"][:nb_row], dtype=np.float64),
+            "H": np.asarray(result["energy"], dtype=np.float64),
+            "config": np.array(json.dumps(args))
+        }
+        if result.get("minimal_height") is not None:
+            data["z_min"] = np.asarray(result["minimal_height"], dtype=np.float64)
+        if result.get("width") is not None:
+            data["b"] = np.asarray(result["width"], dtype=np.float64)
+        envelope = result.get("envelope")
+        if envelope is None:
+            envelope = Envelope.from_matrices(data["t"], data["y"], data["z"], data["H"])
+        data.update(envelope.get_checkpoint())
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **data)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path):
+        """return the dict of arrays of the file (memory maps), with the configuration as a dict and the envelope as an Envelope"""
+        result = dict()
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                name = info.filename[:-len(".npy")]
+                result[name] = ResultFile.__load_member(path, archive, info)
+        result["config"] = json.loads(str(result["config"]))
+        envelope = Envelope(len(result["x"]))
+        envelope.restore({name: (value.item() if value.ndim == 0 else value) for name, value in result.items() if name.startswith("envelope_")})
+        result["envelope"] = envelope
+        return result
+
+    @staticmethod
+    def export_text(path, folder=None, time_step=None):
+        """
+        write the content of the result file in text files (in folder, next to the result file by default) :
+        one file x h z H every time_step seconds (BACKUP_TIME_STEP of the configuration by default) and the envelope files.
+        """
+        result = ResultFile.load(path)
+        if folder is None:
+            folder = os.path.join(os.path.dirname(path), "txt_files")
+        if time_step is None:
+            time_step = result["config"]["BACKUP_TIME_STEP"]
+        os.makedirs(folder, exist_ok=True)
+        x = result["x"]
+        next_t = 0
+        column_name_list = ["x", "h", "z", "H"]
+        for i, ti in enumerate(result["t"].tolist()):
+            if ti >= next_t:
+                next_t += time_step
+                data = [x, result["y"][i], result["z"][i], result["H"][i]]
+                write_datafile(os.path.join(folder, f"{ti:.0f}.txt"), column_name_list, data)
+        ResultFile.export_envelope(result["envelope"], x, folder)
+
+    @staticmethod
+    def export_envelope(envelope, x, folder):
+        """write the envelope of an event (see Envelope) in text files"""
+        write_datafile(os.path.join(folder, "hauteur_max.txt"), ["x", "hmax", "tmax"], [x, envelope.get_max("y"), envelope.get_t_max("y")])
+        write_datafile(os.path.join(folder, "altitude_max.txt"), ["x", "zmax", "tmax"], [x, envelope.get_max("z"), envelope.get_t_max("z")])
+        write_datafile(os.path.join(folder, "charge_max.txt"), ["x", "Hmax", "tmax"], [x, envelope.get_max("H"), envelope.get_t_max("H")])
+        column_name_list = ["x", "hmin", "hmean", "zmin", "zmean", "Hmin", "Hmean", "dz"]
+        data = [x, envelope.get_min("y"), envelope.get_mean("y"), envelope.get_min("z"), envelope.get_mean("z"), envelope.get_min("H"), envelope.get_mean("H"), envelope.get_dz()]
+        write_datafile(os.path.join(folder, "statistiques.txt"), column_name_list, data)
+
+    @staticmethod
+    def __load_member(path, archive, info):
+        """memory map of a stored .npy member of the archive (read in memory if it is compressed)"""
+        if info.compress_type != zipfile.ZIP_STORED:
+            return np.load(archive.open(info))
+        with open(path, "rb") as f:
+            f.seek(info.header_offset)
+            local_header = f.read(30)
+            name_length, extra_length = struct.unpack("<HH", local_header[26:30])
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            version = npy_format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = npy_format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = npy_format.read_array_header_2_0(f)
+            offset = f.tell()
+        if dtype.hasobject or 0 in shape or len(shape) == 0:
+            return np.load(archive.open(info))
+        return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape, order="F" if fortran_order else "C")
@@ -0,0 +1,162 @@
+import os
+import glob
+import numpy as np
+from numpy.lib.format import open_memmap
+
+FIELD_DICT = {"t": "t_list", "Q": "Q_list", "y": "y_matrix", "z": "z_matrix", "H": "h_matrix"} # field name : file name (same names as the np_files of run_back)
+
+class ResultWriter:
+    """
+    Write the result of an event step by step instead of keeping it in memory (see Profile.compute_event).
+    Rows are written in preallocated memory-mapped .npy chunks of chunk_size rows, so the memory used does not depend on the
+    length of the event and the rows already written are still on disk if the computation crashes (see load).
+    A row is written every step computation steps, and at least time_step seconds after the previous row if time_step is given.
+    close merges the chunks into one .npy file per field : t_list, Q_list, y_matrix, z_matrix, h_matrix.
+    """
+
+    def __init__(self, folder, step=1, time_step=None, chunk_size=1024):
+        if step < 1:
+            raise(ValueError(f"step must be at least 1 (step={step})"))
+        self.__folder = folder
+        self.__chunk_folder = os.path.join(folder, "chunks")
+        self.__nb_section = None
+        self.__step = step
+        self.__time_step = time_step
+        self.__chunk_size = chunk_size
+        self.__chunk = None
+        self.__nb_chunk = 0
+        self.__nb_row = 0 # number of rows written
+        self.__row_in_chunk = 0
+        self.__nb_call = 0 # number of calls of write
+        self.__next_t = None
+        self.__last_t = None
+
+    def start(self, x):
+        """called at the start of the event with the abscissa of the sections"""
+        self.__nb_section = len(x)
+        os.makedirs(self.__chunk_folder, exist_ok=True)
+        np.save(os.path.join(self.__folder, "x_list"), np.array(x, dtype=np.float64))
+
+    def write(self, t, Q, y, z, H, force=False):
+        """write the state of the profile at time t if it is time to do so (always if force)"""
+        self.__nb_call += 1
+        if not(force):
+            if (self.__nb_call-1) % self.__step != 0:
+                return False
+            if self.__next_t is not None and t < self.__next_t:
+                return False
+        if t == self.__last_t:
+            return False # already written (forced last row)
+        if self.__chunk is None or self.__row_in_chunk == self.__chunk_size:
+            self.__new_chunk()
+        i = self.__row_in_chunk
+        self.__chunk["t"][i] = t
+        self.__chunk["Q"][i] = Q
+        self.__chunk["y"][i] = y
+        self.__chunk["z"][i] = z
+        self.__chunk["H"][i] = H
+        self.__row_in_chunk += 1
+        self.__nb_row += 1
+        self.__last_t = t
+        if self.__time_step is not None:
+            self.__next_t = t + self.__time_step
+        return True
+
+    def flush(self):
+        if self.__chunk is not None:
+            for array in self.__chunk.values():
+                array.flush()
+
+    def close(self):
+        """merge the chunks into the result files and return them as read-only memory maps (see load)"""
+        self.flush()
+        self.__chunk = None
+        chunk_path_dict = {name: sorted(glob.glob(os.path.join(self.__chunk_folder, f"{name}_*.npy"))) for name in FIELD_DICT}
+        for name, filename in FIELD_DICT.items():
+            shape = (self.__nb_row,) if name in ("t", "Q") else (self.__nb_row, self.__nb_section)
+            merged = open_memmap(os.path.join(self.__folder, f"{filename}.npy"), mode="w+", dtype=np.float64, shape=shape)
+            start = 0
+            for path in chunk_path_dict[name]:
+                chunk = np.load(path, mmap_mode="r")
+                nb_row = min(len(chunk), self.__nb_row-start)
+                merged[start:start+nb_row] = chunk[:nb_row]
+                start += nb_row
+                del chunk
+                os.remove(path)
+            merged.flush()
+            del merged
+        os.rmdir(self.__chunk_folder)
+        return ResultWriter.load(self.__folder)
+
+    def get_checkpoint(self):
+        """state of the writer, to be saved in a checkpoint (see restore). The chunks are flushed first."""
+        self.flush()
+        return {
+            "writer_nb_row": self.__nb_row,
+            "writer_nb_call": self.__nb_call,
+            "writer_nb_chunk": self.__nb_chunk,
+            "writer_row_in_chunk": self.__row_in_chunk,
+            "writer_next_t": np.nan if self.__next_t is None else self.__next_t,
+            "writer_last_t": np.nan if self.__last_t is None else self.__last_t
+        }
+
+    def restore(self, checkpoint):
+        """
+        go back to the state saved by get_checkpoint (after start) : rows written after the checkpoint are removed
+        and the writing goes on in the last chunk.
+        """
+        self.__nb_row = checkpoint["writer_nb_row"]
+        self.__nb_call = checkpoint["writer_nb_call"]
+        self.__nb_chunk = checkpoint["writer_nb_chunk"]
+        self.__row_in_chunk = checkpoint["writer_row_in_chunk"]
+        self.__next_t = None if np.isnan(checkpoint["writer_next_t"]) else checkpoint["writer_next_t"]
+        self.__last_t = None if np.isnan(checkpoint["writer_last_t"]) else checkpoint["writer_last_t"]
+        self.__chunk = None
+        for name in FIELD_DICT:
+            for path in glob.glob(os.path.join(self.__chunk_folder, f"{name}_*.npy")):
+                if int(os.path.basename(path)[len(name)+1:-4]) >= self.__nb_chunk:
+                    os.remove(path)
+        if self.__nb_chunk > 0:
+            self.__chunk = dict()
+            for name in FIELD_DICT:
+                array = open_memmap(os.path.join(self.__chunk_folder, f"{name}_{self.__nb_chunk-1:05d}.npy"), mode="r+")
+                array[self.__row_in_chunk:] = np.nan
+                self.__chunk[name] = array
+
+    def get_nb_row(self):
+        return self.__nb_row
+
+    def get_folder(self):
+        return self.__folder
+
+    def __new_chunk(self):
+        self.flush()
+        self.__chunk = dict()
+        for name in FIELD_DICT:
+            shape = (self.__chunk_size,) if name in ("t", "Q") else (self.__chunk_size, self.__nb_section)
+            array = open_memmap(os.path.join(self.__chunk_folder, f"{name}_{self.__nb_chunk:05d}.npy"), mode="w+", dtype=np.float64, shape=shape)
+            array[:] = np.nan # rows never written are nan (see load)
+            self.__chunk[name] = array
+        self.__nb_chunk += 1
+        self.__row_in_chunk = 0
+
+    @staticmethod
+    def load(folder):
+        """
+        return the dict {field: array} of results written in folder, fields being x, t, Q, y, z, H.
+        Merged files are memory-mapped, chunks of an unfinished computation are concatenated and their unwritten rows removed.
+        """
+        result = {"x": np.load(os.path.join(folder, "x_list.npy"))}
+        chunk_folder = os.path.join(folder, "chunks")
+        if not(os.path.isdir(chunk_folder)):
+            for name, filename in FIELD_DICT.items():
+                result[name] = np.load(os.path.join(folder, f"{filename}.npy"), mmap_mode="r")
+            return result
+        for name in FIELD_DICT:
+            path_list = sorted(glob.glob(os.path.join(chunk_folder, f"{name}_*.npy")))
+            result[name] = np.concatenate([np.load(path) for path in path_list]) if len(path_list) > 0 else np.empty((0,) if name in ("t", "Q") else (0, len(result["x"])))
+        nb_row = min(len(result[name]) for name in FIELD_DICT) # the crash may have happened while creating a chunk
+        written = np.logical_not(np.isnan(result["t"][:nb_row]))
+        for name in FIELD_DICT:
+            result[name] = result[name][:nb_row][written]
+        return result
@@ -1,242 +1,314 @@
 import logging as lg
-import matplotlib.pyplot as plt
 import numpy as np
 import json
 import os
+import glob
+import shutil
 import datetime as dt
+import importlib
 
-from src.utils import parse_datafile, write_datafile, inter_xy, hydrogrammeLavabre
+from src.utils import load_datafile, inter_xy, hydrogrammeLavabre, write_datafile
 from src.rectangularSection import RectangularSection
 from src.trapezoidalSection import TrapezoidalSection
 from src.perf import Performance
 from src.profile import Profile
 from src.granulometry import Granulometry
-from src.sedimentTransport.lefortsogreah1991 import LefortSogreah1991
-from src.sedimentTransport.lefort2015 import Lefort2015
-from src.sedimentTransport.rickenmann1990 import Rickenmann1990
-from src.sedimentTransport.rickenmann1991 import Rickenmann1991
-from src.sedimentTransport.meunier1989 import Meunier1989
-from src.sedimentTransport.meyerpeter1948 import MeyerPeter1948
-from src.sedimentTransport.pitonrecking2017 import PitonRecking2017
-from src.sedimentTransport.piton2016 import Piton2016
-
-def run_back(args, hydrau=None):
+from src.resultWriter import ResultWriter
+from src.resultFile import ResultFile
+from src.telemetry import Telemetry
+
+TRANSPORT_LAW_DICT = { # module of each sediment transport law, imported only when the law is used
+    "Lefort2015": "src.sedimentTransport.lefort2015",
+    "LefortSogreah1991": "src.sedimentTransport.lefortsogreah1991",
+    "Meunier1989": "src.sedimentTransport.meunier1989",
+    "Rickenmann1991": "src.sedimentTransport.rickenmann1991",
+    "Rickenmann1990": "src.sedimentTransport.rickenmann1990",
+    "MeyerPeter1948": "src.sedimentTransport.meyerpeter1948",
+    "PitonRecking2017": "src.sedimentTransport.pitonrecking2017",
+    "Piton2016": "src.sedimentTransport.piton2016"
+}
+FRICTION_LAW_LIST = ["Ferguson", "Manning-Strickler"]
+CHECKPOINT_FILENAME = "checkpoint.npz"
+RESULT_FILENAME = "results.npz"
+BOUNDARY_CONDITION_LIST = ["normal_depth", "critical_depth"]
+
+def run_back(args, hydrau=None, resume=False, plot=True):
     """
     Interface between front and back : read args, initialize objects, then launch computations 
+    If resume is True, the event restarts from the last checkpoint found in ./results (see Profile.compute_event)
+    If plot is False (headless mode), matplotlib is never imported : RENDER is ignored and the water depths of an hydraulic
+    computation are written in hydrau.txt instead of being plotted.
+    """
+    granulometry_list = build_granulometry_list(args)
+    if build_hydrogram(args) is None:
+        return
+    profile = build_profile(args, granulometry_list)
+    if profile is None:
+        return
+    if build_transport_law(args["TRANSPORT_LAW"]) is None or not(check_model_args(args)):
+        return
+
+    # result
+    if hydrau == None:
+        
+        folder = find_checkpoint_folder("./results") if resume else None
+        if resume and folder is None:
+            print("WARNING : no checkpoint found in ./results, the event starts from the beginning")
+        if folder is None:
+            e = dt.datetime.now()
+            folder = os.path.join("./results", f"{e.year}_{e.month}_{e.day}_{e.hour}_{e.minute}_{e.second}")
+        if not(os.path.isdir("./results")):
+            print("./results folder created.")
+        os.makedirs(folder, exist_ok=True)
+        writer = build_writer(args, folder)
+        if args["PERF"]:
+            Performance.start() 
+        result = run_event(args, profile, writer=writer, telemetry=build_telemetry(args, folder), checkpoint=os.path.join(folder, CHECKPOINT_FILENAME), resume=resume)
+        if args["PERF"]:
+            Performance.stop()
+        if result is None:
+            return
+        if args["PERF"]:
+            Performance.save_perf(os.path.join(folder, "perf.txt"))
+            Performance.save_json(os.path.join(folder, "perf.json"))
+            Performance.save_collapsed(os.path.join(folder, "perf.collapsed"))
+        save_result(args, result, folder, streamed=(writer is not None))
+        if plot and args.get("RENDER", False):
+            from src.render import Render # plots are only made on demand, headless runs never import matplotlib here
+            Render.render(os.path.join(folder, RESULT_FILENAME), nb_frame=args.get("RENDER_FRAMES", 300))
+        
+    elif plot:
+        import matplotlib.pyplot as plt
+        # profile.plot(Q=hydrau)
+        y_list = profile.compute_depth(hydrau, plot=True, method="ImprovedEuler", friction_law=args["FRICTION_LAW"], upstream_condition=args["UPSTREAM_CONDITION"], downstream_condition=args["DOWNSTREAM_CONDITION"])
+        plt.show()
+    else:
+        y_list = profile.compute_depth(hydrau, method="ImprovedEuler", friction_law=args["FRICTION_LAW"], upstream_condition=args["UPSTREAM_CONDITION"], downstream_condition=args["DOWNSTREAM_CONDITION"])
+        write_datafile("./hydrau.txt", ["x", "z", "h"], [profile.get_x_list(), profile.get_z_list(), y_list])
+        print(f"water depths for Q={hydrau}m3/s written in hydrau.txt")
+
+    return
+
+def run_event(args, profile, writer=None, telemetry=None, checkpoint=None, resume=False):
     """
-    # granulometry
-    granulometry_files = args["GRANULOMETRY_FILES"]
+    build the hydrogram, the transport law and the sedimentogram described by args, then compute the event on the given profile.
+    It returns the result of Profile.compute_event (None if args are not valid).
+    Optional args : CHECKPOINT_PERIOD (seconds of computation between two checkpoints, 600 by default),
+    MULTIRATE (dict of multirate options, see build_multirate_kwargs)
+    """
+    hydrogram = build_hydrogram(args)
+    if hydrogram is None:
+        return None
+    t, Q = hydrogram
+    transport_law = build_transport_law(args["TRANSPORT_LAW"])
+    if transport_law is None or not(check_model_args(args)):
+        return None
+    QsIn = build_sedimentogram(args, transport_law, profile.get_upstream_section().get_granulometry(), Q)
+    return profile.compute_event(Q, t, transport_law, sedimentogram=QsIn, backup=False, debug=False, method="ImprovedEuler", friction_law=args["FRICTION_LAW"], cfl=args["SPEED_COEF"], critical=args["CRITICAL"], upstream_condition=args["UPSTREAM_CONDITION"], downstream_condition=args["DOWNSTREAM_CONDITION"], plot=False, writer=writer, telemetry=telemetry, checkpoint=checkpoint, checkpoint_period=args.get("CHECKPOINT_PERIOD", 600), resume=resume, **build_multirate_kwargs(args))
+
+def find_checkpoint_folder(results_folder):
+    """return the result folder containing the most recent checkpoint, None if there is no checkpoint"""
+    path_list = glob.glob(os.path.join(results_folder, "*", CHECKPOINT_FILENAME))
+    if len(path_list) == 0:
+        return None
+    return os.path.dirname(max(path_list, key=os.path.getmtime))
+
+def build_granulometry_list(args):
     granulometry_list = []
-    for path in granulometry_files:
+    for path in args["GRANULOMETRY_FILES"]:
         granulo = json.load(open(path, 'r'))
         granulometry_list.append(Granulometry(**granulo)) #dm=granulo["dm"], d30=granulo["d30"], d50=granulo["d50"], d90=granulo["d90"], d84tb=granulo["d84tb"], d84bs=granulo["d84bs"], Gr=granulo["Gr"]))
-    
-    # hydrogram
+    return granulometry_list
+
+def build_hydrogram(args):
+    """return (t, Q) lists of the hydrogram described by args, None if it can not be built"""
     if args["LAVABRE"]:
         if args["DURATION"] > 0 and args["DT"] > 0:
             t = np.arange(0, args["DURATION"]+args["DT"], args["DT"])
         else:
             print("ERROR : while building lavabre hydrogram time_list, DURATION and DT must be positive (>0)")
-            return
+            return None
         try:
             Q = hydrogrammeLavabre(args["QM"],args["TM"],args["ALPHA"],args["QB"],t)
         except ValueError:
             print("ERROR : simulation aborted while building lavabre hydrogram")
-            return
+            return None
     else:
-        hydrogram_data = parse_datafile(args["HYDROGRAM_PATH"])
         try:
-            t = hydrogram_data[0]
-            Q = hydrogram_data[1]
-        except IndexError:
-            print("ERROR : hydrogram data must have exactly 2 columns : t Q")
-            return
+            hydrogram_data = load_datafile(args["HYDROGRAM_PATH"])
         except FileNotFoundError:
             print(f"ERROR : {args['HYDROGRAM_PATH']} does not exist")
+            return None
+        except ValueError as e:
+            print(f"ERROR : {e}")
+            return None
+        name_list = hydrogram_data.dtype.names
+        if len(name_list) != 2:
+            print("ERROR : hydrogram data must have exactly 2 columns : t Q")
+            return None
+        t = np.ascontiguousarray(hydrogram_data[name_list[0]])
+        Q = np.ascontiguousarray(hydrogram_data[name_list[1]])
+    return t, Q
 
-    # profile
+def build_profile(args, granulometry_list):
+    """read the profile data file described by args and return the (interpolated) profile, None if it can not be built"""
     section = args["SECTION"]
     try:
-        data = parse_datafile(args["PROFILE_PATH"])
+        data = load_datafile(args["PROFILE_PATH"])
     except FileNotFoundError:
         print(f"ERROR : {args['PROFILE_PATH']} does not exist")
-    try:
-        first_line = open(args["PROFILE_PATH"], 'r').readlines()[0].split()
-    except IndexError:
-        print(f"ERROR : no data in {args['PROFILE_PATH']}")
-        return
-    try:
-        x = data[first_line.index('x')]
-        z = data[first_line.index('z')]
-        if x[z.index(min(z))] < x[z.index(max(z))]:
-            print("INFO : reversed abscissa (computations are done with upstream for lower x)")
-            x_mini = min(x)
-            x_maxi = max(x)
-            x = [x_mini + x_maxi - xi for xi in x]
-        b = data[first_line.index('b')]
-    except ValueError:
+        return None
+    except ValueError as e:
+        print(f"ERROR : {e}")
+        return None
+    column_list = data.dtype.names
+    if not(all(name in column_list for name in ('x', 'z', 'b'))):
         print("ERROR : the first line of your data file must be column titles with at least x, z, b")
-        return
-    try:
-        z_min = data[first_line.index('zmin')]
-    except ValueError:
+        return None
+    x = data['x'].tolist()
+    z = data['z'].tolist()
+    if x[z.index(min(z))] < x[z.index(max(z))]:
+        print("INFO : reversed abscissa (computations are done with upstream for lower x)")
+        x_mini = min(x)
+        x_maxi = max(x)
+        x = [x_mini + x_maxi - xi for xi in x]
+    b = data['b'].tolist()
+    if 'zmin' in column_list:
+        z_min = data['zmin'].tolist()
+    else:
         print("WARNING : zmin set equal to z because there is no column 'zmin' found")
         z_min = [None for _ in range(len(z))]
-    try:
-        y_max = data[first_line.index('ymax')]
-    except ValueError:
+    if 'ymax' in column_list:
+        y_max = data['ymax'].tolist()
+    else:
         print("WARNING : ymax set on its default value because there is no column 'ymax' found")
         y_max = [None for _ in range(len(z))]
-    try:
-        granulo_index = data[first_line.index('granulometry')]
-        granulo_index = [int(i)-1 for i in granulo_index]
-    except ValueError:
+    if 'granulometry' in column_list:
+        granulo_index = [int(i)-1 for i in data['granulometry'].tolist()]
+    else:
         print("WARNING : granulometry set on the first granulometry by default because there is no column 'granulometry' found")
         granulo_index = [0 for _ in range(len(z))]
-    try:
-        manning = data[first_line.index('manning')]
-    except ValueError:
+    if 'manning' in column_list:
+        manning = data['manning'].tolist()
+    else:
         print("WARNING : manning coefficient computed with granulometry because there is no column 'manning' found")
         manning = [None for _ in range(len(z))]        
+    list_of_section = []
     if section=="trapezoidal":
-        try:
-            s = data[first_line.index('s')]
-        except ValueError:
+        if not('s' in column_list):
             print("ERROR : the first line of your data file must be column titles. Trapezoidal section need one column called 's' for slope of the sides")
-            return
+            return None
+        s = data['s'].tolist()
+        for i in range(len(x)):
+            list_of_section.append(TrapezoidalSection(x[i], z[i], b[i], s[i], z_min=z_min[i], y_max=y_max[i], granulometry=granulometry_list[granulo_index[i]], manning=manning[i]))
     elif section=="rectangular":
-        list_of_section = []
         for i in range(len(x)):
             list_of_section.append(RectangularSection(x[i], z[i], b[i], z_min=z_min[i], y_max=y_max[i], granulometry=granulometry_list[granulo_index[i]], manning=manning[i]))
-        if len(list_of_section)<2:
-            print(f"ERROR : you need at least 2 sections to build a profile (currently {len(list_of_section)})")
-            return
-        profile = Profile(list_of_section, name=args["NAME"])
-        if args["INTERPOLATION"]:
-            if args["DX"] == None:
-                print("ERROR : interpolation set on true but no dx was given (dx=null)")
-            else:
-                profile.complete(args["DX"])
-        # profile.export("./profile_export.pkl")
     else:
         print(f"unknown section : {section}. Execution aborted.")
+        return None
+    if len(list_of_section)<2:
+        print(f"ERROR : you need at least 2 sections to build a profile (currently {len(list_of_section)})")
+        return None
+    profile = Profile(list_of_section, name=args["NAME"])
+    if args["INTERPOLATION"]:
+        if args.get("NB_SECTION") != None:
+            refine_profile(args, profile)
+        elif args["DX"] == None:
+            print("ERROR : interpolation set on true but no dx was given (dx=null)")
+        else:
+            profile.complete(args["DX"])
+    # profile.export("./profile_export.pkl")
+    return profile
 
-    # sedimentogram
-    I = float(args["UPSTREAM_SLOPE"])*0.01 # slope is given in %
-    transport_law_value = args["TRANSPORT_LAW"]
-    if transport_law_value == "Lefort2015":
-        transport_law = Lefort2015()
-    elif transport_law_value == "LefortSogreah1991":
-        transport_law = LefortSogreah1991()
-    elif transport_law_value == "Meunier1989":
-        transport_law = Meunier1989()
-    elif transport_law_value == "Rickenmann1991":
-        transport_law = Rickenmann1991()
-    elif transport_law_value == "Rickenmann1990":
-        transport_law = Rickenmann1990()
-    elif transport_law_value == "MeyerPeter1948":
-        transport_law = MeyerPeter1948()
-    elif transport_law_value == "PitonRecking2017":
-        transport_law = PitonRecking2017()
-    elif transport_law_value == "Piton2016":
-        transport_law = Piton2016()
-    else:
-        print(f"ERROR : unknown sediment transport law (= {transport_law_value})")
+def refine_profile(args, profile):
+    """
+    adaptive refinement of the profile with NB_SECTION sections (see Profile.complete_adaptive), variations being measured
+    for the peak discharge of the hydrogram. DX, if given, is the maximum distance between two sections.
+    """
+    hydrogram = build_hydrogram(args)
+    if hydrogram is None:
+        print("ERROR : adaptive interpolation needs the hydrogram, profile not refined")
         return
-    i_upstream = x.index(min(x))
-    QsIn = [transport_law.compute_Qs_formula(args["UPSTREAM_WIDTH"], granulometry_list[granulo_index[i_upstream]], Q[i], I) for i, ti in enumerate(t)]
+    Q = float(np.max(hydrogram[1]))
+    y_list = profile.get_yc_list(Q) if args["CRITICAL"] else None
+    profile.complete_adaptive(Q, args["NB_SECTION"], ratio=args.get("REFINEMENT_RATIO", 10), dx_max=args["DX"], y_list=y_list, friction_law=args["FRICTION_LAW"], upstream_condition=args["UPSTREAM_CONDITION"], downstream_condition=args["DOWNSTREAM_CONDITION"])
 
-    # friction law
-    friction_law_list = ["Ferguson", "Manning-Strickler"]
-    if not(args["CRITICAL"]) and not(args["FRICTION_LAW"] in friction_law_list):
-        print(f"ERROR : critical set on false and unknown friction law : {args['FRICTION_LAW']}, it must be one of these : {friction_law_list}")
-        return
+def build_transport_law(transport_law_value):
+    try:
+        module = TRANSPORT_LAW_DICT[transport_law_value]
+    except (KeyError, TypeError):
+        print(f"ERROR : unknown sediment transport law (= {transport_law_value})")
+        return None
+    return getattr(importlib.import_module(module), transport_law_value)()
 
-    # boundary condition
-    cl_list = ["normal_depth", "critical_depth"]
-    if not(args["UPSTREAM_CONDITION"] in cl_list):
-        print("ERROR : UPSTREAM_CONDITION must be one of these : 'normal_depth'/'critical_depth' ")
-        return
-    if not(args["DOWNSTREAM_CONDITION"] in cl_list):
-        print("ERROR : DOWNSTREAM_CONDITION must be one of these : 'normal_depth'/'critical_depth' ")
-        return
+def build_sedimentogram(args, transport_law, granulometry, Q):
+    """solid discharge coming into the profile for each value of the hydrogram"""
+    I = float(args["UPSTREAM_SLOPE"])*0.01 # slope is given in %
+    return transport_law.compute_Qs_formula_array(args["UPSTREAM_WIDTH"], granulometry, np.asarray(Q, dtype=np.float64), I)
 
-    # result
-    if hydrau == None:
-        
-        if args["PERF"]:
-            Performance.start() 
-        result = profile.compute_event(Q, t, transport_law, sedimentogram=QsIn, backup=False, debug=False, method="ImprovedEuler", friction_law=args["FRICTION_LAW"], cfl=args["SPEED_COEF"], critical=args["CRITICAL"], upstream_condition=args["UPSTREAM_CONDITION"], downstream_condition=args["DOWNSTREAM_CONDITION"], plot=False)
-        if args["PERF"]:
-            Performance.stop()
-        try:
-            os.chdir("./results")
-        except FileNotFoundError:
-            os.mkdir("./results")
-            os.chdir("./results")
-            print("./results folder created.")
-        e = dt.datetime.now()
-        try:
-            os.mkdir(f"./{e.year}_{e.month}_{e.day}_{e.hour}_{e.minute}_{e.second}")
-        except FileExistsError:
-            pass
-        os.chdir(f"./{e.year}_{e.month}_{e.day}_{e.hour}_{e.minute}_{e.second}")
+def build_writer(args, folder):
+    """
+    ResultWriter streaming the event into folder/np_files if STREAM_RESULTS is set on true in args, None otherwise.
+    Optional args : STREAM_STEP (a row every STREAM_STEP computation steps), STREAM_TIME_STEP (minimum time between two rows)
+    """
+    if not(args.get("STREAM_RESULTS", False)):
+        return None
+    return ResultWriter(os.path.join(folder, "np_files"), step=args.get("STREAM_STEP", 1), time_step=args.get("STREAM_TIME_STEP"))
 
-        if args["PERF"]:
-            Performance.save_perf("./perf.txt")
-
-        json.dump(args, open("./conf_reminder.json", 'w'), indent=6)
-        step = args["BACKUP_TIME_STEP"]
-        ani = result["animation"]
-        x = result["abscissa"]
-        y_matrix = result["water_depth"]
-        z_matrix = result["bottom_height"]
-        t_list = result["time"]
-        h_matrix = result["energy"]
-        try:
-            os.mkdir("./np_files")
-        except FileExistsError:
-            pass
-        os.chdir("./np_files")
-        np.save("./x_list", np.array(x))
-        np.save("./t_list", np.array(t_list))
-        np.save("./y_matrix", np.array(y_matrix))
-        np.save("./z_matrix", np.array(z_matrix))
-        np.save("./h_matrix", np.array(h_matrix))
-        os.chdir("..")
-        try:
-            os.mkdir("./txt_files")
-        except FileExistsError:
-            pass
-        os.chdir("./txt_files")
-        next_t = 0
-        column_name_list = ["x", "h", "z", "H"]
-        for i, ti in enumerate(t_list):
-            if ti >= next_t:
-                next_t += step
-                filename = f"{ti:.0f}.txt"
-                # save
-                data = [x, y_matrix[i], z_matrix[i], h_matrix[i]]
-                write_datafile(filename, column_name_list, data)
-
-        y_matrix_bis = [[y_matrix[i][xi] for i in range(len(t_list))] for xi in range(len(x))]
-        data = [x, [max(y_matrix_bis[i]) for i in range(len(x))], [t_list[y_matrix_bis[i].index(max(y_matrix_bis[i]))] for i in range(len(x))]]
-        column_name_list = ["x", "hmax", "tmax"]
-        write_datafile("hauteur_max.txt", column_name_list, data)
-
-        z_matrix_bis = [[z_matrix[i][xi] for i in range(len(t_list))] for xi in range(len(x))]
-        data = [x, [max(z_matrix_bis[i]) for i in range(len(x))], [t_list[z_matrix_bis[i].index(max(z_matrix_bis[i]))] for i in range(len(x))]]
-        column_name_list = ["x", "zmax", "tmax"]
-        write_datafile("altitude_max.txt", column_name_list, data)
-
-        h_matrix_bis = [[h_matrix[i][xi] for i in range(len(t_list))] for xi in range(len(x))]
-        data = [x, [max(h_matrix_bis[i]) for i in range(len(x))], [t_list[h_matrix_bis[i].index(max(h_matrix_bis[i]))] for i in range(len(x))]]
-        column_name_list = ["x", "Hmax", "tmax"]
-        write_datafile("charge_max.txt", column_name_list, data)        
-        
-    else:
-        # profile.plot(Q=hydrau)
-        y_list = profile.compute_depth(hydrau, plot=True, method="ImprovedEuler", friction_law=args["FRICTION_LAW"], upstream_condition=args["UPSTREAM_CONDITION"], downstream_condition=args["DOWNSTREAM_CONDITION"])
-    plt.show()
+def build_telemetry(args, folder):
+    """
+    Telemetry logging the solver step by step in folder if TELEMETRY is set in args : "csv" (telemetry.csv) or "binary"
+    (telemetry.bin, see Telemetry.load), None otherwise.
+    """
+    log_format = args.get("TELEMETRY")
+    if not(log_format):
+        return None
+    if not(log_format in ("csv", "binary")):
+        print(f"WARNING : unknown TELEMETRY format (= {log_format}), 'csv' or 'binary' expected, no telemetry")
+        return None
+    return Telemetry(os.path.join(folder, "telemetry.csv" if log_format == "csv" else "telemetry.bin"))
 
-    return
+def build_multirate_kwargs(args):
+    """
+    arguments of Profile.compute_event for the multirate scheme. It is used if args has a MULTIRATE dict, whose optional keys are
+    Q_RTOL, Z_TOL, MAX_SKIP, MORPHO_CFL and DT_MAX (see Profile.compute_event), for example "MULTIRATE": {"Z_TOL": 0.02}
+    """
+    options = args.get("MULTIRATE")
+    if not(isinstance(options, dict)):
+        return dict()
+    kwargs = {"multirate": True}
+    for key, name in [("Q_RTOL", "hydraulic_Q_rtol"), ("Z_TOL", "hydraulic_z_tol"), ("MAX_SKIP", "hydraulic_max_skip"), ("MORPHO_CFL", "morpho_cfl"), ("DT_MAX", "dt_max")]:
+        if key in options:
+            kwargs[name] = options[key]
+    return kwargs
+
+def check_model_args(args):
+    """check friction law and boundary conditions, return False (and print why) if they are not valid"""
+    if not(args["CRITICAL"]) and not(args["FRICTION_LAW"] in FRICTION_LAW_LIST):
+        print(f"ERROR : critical set on false and unknown friction law : {args['FRICTION_LAW']}, it must be one of these : {FRICTION_LAW_LIST}")
+        return False
+    if not(args["UPSTREAM_CONDITION"] in BOUNDARY_CONDITION_LIST):
+        print("ERROR : UPSTREAM_CONDITION must be one of these : 'normal_depth'/'critical_depth' ")
+        return False
+    if not(args["DOWNSTREAM_CONDITION"] in BOUNDARY_CONDITION_LIST):
+        print("ERROR : DOWNSTREAM_CONDITION must be one of these : 'normal_depth'/'critical_depth' ")
+        return False
+    return True
+
+def save_result(args, result, folder, streamed=False):
+    """
+    write the configuration and the result of an event (see Profile.compute_event) in folder : everything is stored in
+    one result file (see ResultFile), text files are exported from it if TEXT_EXPORT is set on true in args (default).
+    If the result has been streamed by a ResultWriter (streamed=True), its np_files are removed once the result file is written.
+    """
+    json.dump(args, open(os.path.join(folder, "conf_reminder.json"), 'w'), indent=6)
+    path = os.path.join(folder, RESULT_FILENAME)
+    ResultFile.save(path, args, result)
+    if streamed:
+        saved = ResultFile.load(path) # the result no longer refers to the np_files, which can be removed
+        for key, name in [("time", "t"), ("water_discharge", "Q"), ("water_depth", "y"), ("bottom_height", "z"), ("energy", "H")]:
+            result[key] = saved[name]
+        shutil.rmtree(os.path.join(folder, "np_files"))
+    if args.get("TEXT_EXPORT", True):
+        ResultFile.export_text(path, os.path.join(folder, "txt_files"), args["BACKUP_TIME_STEP"])
@@ -1,5 +1,7 @@
 from src.sedimentTransport.sedimentTransportLaw import SedimentTransportLaw
+import numpy as np
 from src.sedimentTransport.rickenmann1991 import Rickenmann1991
+from src.perf import Performance
 from src.utils import G
 
 class MeyerPeter1948(SedimentTransportLaw):
@@ -7,8 +9,8 @@ class MeyerPeter1948(SedimentTransportLaw):
     def __init__(self):
         return
 
-    def compute_Qs_formula(self, b, granulometry, Q, I):
-        return Rickenmann1991().compute_Qs_formula(b, granulometry, Q, I)
+    def compute_Qs_formula_array(self, b, granulometry, Q, I):
+        return Rickenmann1991().compute_Qs_formula_array(b, granulometry, Q, I)
 
     def compute_Qs(self, section, Q, y, y_down):
         Q=max(Q,0.001)
@@ -34,5 +36,28 @@ class MeyerPeter1948(SedimentTransportLaw):
         Qs = max(0, Qs)
         return Qs
 
+    @Performance.measure_perf
+    def compute_Qs_array(self, state, Q, y):
+        Q=max(Q,0.001)
+        I = self.get_I_array(state, Q, y)
+        # inter_section of compute_Qs : rectangular section interpolated at the middle of each section and its down section
+        y_inter = 0.5*(y + np.append(y[1:], y[-1]))
+        b_inter = 0.5*(state.b + np.append(state.b[1:], state.b[-1]))
+        d50 = state.granulometry.d50
+        d90 = state.granulometry.d90
+        R = (Q*b_inter)/(b_inter + 2*Q) # same evaluation as inter_section.get_R(Q, ...) in compute_Qs
+        n_bis = (d90/26)**(1/6)
+        n = (R**(2/3)*I**0.5)/(Q/(y_inter*b_inter))
+        correction_coef = (n_bis/n)**(3/2)
+        correction_coef = np.where(correction_coef < 1, correction_coef, 1)
+
+        tau_star = R*I/(1.65*d50)
+        with np.errstate(invalid="ignore"):
+            phi = 8*(correction_coef*tau_star-0.047)**(3/2)
+        qsv = phi * (G*1.65*d50**3)**0.5
+        Qs = qsv * b_inter / 0.75 # debit apparent
+        Qs = np.where(Qs > 0, Qs, 0)
+        return Qs
+
     def __str__(self):
         return "Meyer-Peter & Muller 1948"
\ No newline at end of file
@@ -1,21 +1,19 @@
 from src.sedimentTransport.sedimentTransportLaw import SedimentTransportLaw
 from src.utils import G
+import numpy as np
 
 class Piton2016(SedimentTransportLaw):
 
     def __init__(self):
         return
 
-    def compute_Qs_formula(self, b, granulometry, Q, I):
-        Q=max(Q,0.001)
-        I=max(I,0.001) 
+    def compute_Qs_formula_array(self, b, granulometry, Q, I):
+        Q=np.maximum(Q,0.001)
+        I=np.maximum(I,0.001)
         d84bs = granulometry.d84bs
         q=Q/b
         qe=q/(G*I*d84bs**3)**0.5
-        if qe<100:
-            p=0.24
-        else:
-            p=0.31
+        p=np.where(qe<100, 0.24, 0.31)
         Qsv=0.00058*b*d84bs**(1.5-7.5*p)*q**(5*p)*I**(2.5*(1-p))/p**6.25/G**(2.5*p)
         Qsapp=Qsv*2650/2000
         return Qsapp
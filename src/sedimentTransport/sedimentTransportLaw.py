@@ -1,3 +1,4 @@
+import numpy as np
 from abc import ABC, abstractmethod
 from src.perf import Performance
 
@@ -23,12 +24,42 @@ class SedimentTransportLaw(ABC):
         b = 0.5*(section.get_b(y) + section.get_down_section().get_b(y_down))
         return self.compute_Qs_formula(b, section.get_granulometry(), Q, I)
 
-    @abstractmethod
-    def compute_Qs_formula(self, b, granulometry, Q, I): 
-        pass
+    @Performance.measure_perf
+    def compute_Qs_array(self, state, Q, y):
+        """
+        compute_Qs for every section of a prismatic profile at once.
+        state is the ProfileState of the profile and y the array of water depth, it returns the array of sediment discharge.
+        """
+        Q=max(Q,0.001)
+        I = self.get_I_array(state, Q, y)
+        y_down = np.append(y[1:], y[-1])
+        b_down = np.append(state.get_b(y[1:], slice(1, None)), state.get_b(y[-1:], slice(-1, None)))
+        b = 0.5*(state.get_b(y) + b_down)
+        return self.compute_Qs_formula_array(b, state.granulometry, Q, I)
+
+    def get_I_array(self, state, Q, y):
+        """
+        slope used by compute_Qs for every section : slope of the energy grade line between a section and its down section,
+        friction slope for the downstream section.
+        """
+        H = state.get_H(Q, y)
+        I = np.empty_like(H)
+        I[:-1] = (H[:-1] - H[1:]) / state.get_dx()
+        I[-1] = state.get_Sf(Q, y[-1:], slice(-1, None))[0]
+        return np.maximum(I, 0.001)
+
+    def compute_Qs_formula(self, b, granulometry, Q, I):
+        """
+        sediment discharge for a width b, a granulometry, a water discharge Q and a slope I (scalar version of compute_Qs_formula_array)
+        """
+        return float(self.compute_Qs_formula_array(b, granulometry, Q, I))
 
     @abstractmethod
-    def compute_Qs_formula(self, b, granulometry, Q, I): 
+    def compute_Qs_formula_array(self, b, granulometry, Q, I):
+        """
+        Array version of compute_Qs_formula : b, Q, I and the attributes of granulometry can be numpy arrays (of the same shape) or floats.
+        It returns the array of sediment discharge.
+        """
         pass
 
     # operators overloading
@@ -0,0 +1,108 @@
+import numpy as np
+
+COUNTER_LIST = ("down_sweep", "up_sweep", "newton_iteration", "newton_fallback", "brentq_iteration", "brentq_failure", "secant_fallback")
+DTYPE = np.dtype([
+    ("step", "<i8"),
+    ("t", "<f8"),
+    ("Q", "<f8"),
+    ("dt", "<f8"),
+    ("dt_cfl", "<f8"),              # time step given by the water velocity (dt can be longer with multirate)
+    ("limiter", "<i4"),             # reach imposing dt_cfl (between the sections limiter and limiter+1)
+    ("hydraulic", "<i1"),           # 1 if the water depth has been computed on this step, 0 if the previous one was used (multirate)
+    ("down_sweep", "<i4"),          # passes of compute_depth toward downstream (supercritical) and upstream (subcritical)
+    ("up_sweep", "<i4"),
+    ("hydraulic_jump", "<i4"),
+    ("newton_iteration", "<i4"),    # iterations of utils.newton_y_from_Hs
+    ("newton_fallback", "<i4"),     # newton_y_from_Hs failures solved again by brentq
+    ("brentq_iteration", "<i4"),
+    ("brentq_failure", "<i4"),      # no solution found by brentq (Y_MIN or Y_MAX returned)
+    ("secant_fallback", "<i4"),     # brentq failures of get_yc and get_yn solved by the secant method
+    ("mass_error", "<f8"),          # sediment volume created (or lost) by the step : Vs_in - Vs_out - stored volume change (m3)
+    ("time_hydraulic", "<f8"),      # wall time of the phases of the step (s)
+    ("time_dt", "<f8"),
+    ("time_sediment", "<f8"),
+    ("time_output", "<f8")
+])
+
+class Telemetry:
+    """
+    Log of the solver written step by step during an event (see Profile.compute_event) : one record per time step with the time
+    step and the reach limiting it, the work of the hydraulic computation (sweeps, hydraulic jumps, root finder iterations and
+    fallbacks), the sediment mass balance error and the wall time of each phase. Fields are described by DTYPE.
+    The log is a csv file if path ends with .csv, else a binary file of DTYPE records (8 times smaller, read it with load).
+    Records are buffered and written every buffer_size steps.
+    Root finders report their work with Telemetry.count, which does nothing when no telemetry is recording.
+    """
+    counter = None # counters of the current step, None when no telemetry is recording
+
+    def __init__(self, path, buffer_size=256):
+        self.__path = path
+        self.__csv = path.endswith(".csv")
+        self.__buffer = np.zeros(buffer_size, dtype=DTYPE)
+        self.__nb_row = 0 # rows in the buffer
+        self.__file = None
+
+    def start(self, append=False):
+        """open the log (rows are added to the existing log if append, to resume a computation) and start counting"""
+        self.__file = open(self.__path, ("a" if append else "w") + ("" if self.__csv else "b"))
+        if self.__csv and self.__file.tell() == 0:
+            self.__file.write(",".join(DTYPE.names) + "\n")
+        self.__nb_row = 0
+        Telemetry.counter = dict.fromkeys(COUNTER_LIST, 0)
+
+    def record(self, **values):
+        """add the record of a step : values of the fields which are not counters, counters are read (and reset) here"""
+        row = self.__buffer[self.__nb_row]
+        for name, value in values.items():
+            row[name] = value
+        counter = Telemetry.counter
+        for name in COUNTER_LIST:
+            row[name] = counter[name]
+            counter[name] = 0
+        self.__nb_row += 1
+        if self.__nb_row == len(self.__buffer):
+            self.flush()
+
+    def flush(self):
+        if self.__file is None or self.__nb_row == 0:
+            return
+        rows = self.__buffer[:self.__nb_row]
+        if self.__csv:
+            self.__file.writelines(",".join(repr(value.item()) for value in row) + "\n" for row in rows)
+        else:
+            rows.tofile(self.__file)
+        self.__file.flush()
+        self.__nb_row = 0
+
+    def close(self):
+        self.flush()
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+        Telemetry.counter = None
+
+    def get_path(self):
+        return self.__path
+
+    @staticmethod
+    def count(name, n=1):
+        """add n to the counter name of the current step, if a telemetry is recording"""
+        counter = Telemetry.counter
+        if counter is not None:
+            counter[name] += n
+
+    @staticmethod
+    def load(path):
+        """
+        return the records of a log as a structured array (fields of DTYPE). Steps computed again after a resume are only
+        kept once (the last computation).
+        """
+        if path.endswith(".csv"):
+            data = np.loadtxt(path, delimiter=",", skiprows=1, ndmin=2)
+            records = np.zeros(len(data), dtype=DTYPE)
+            for i, name in enumerate(DTYPE.names):
+                records[name] = data[:, i]
+        else:
+            records = np.fromfile(path, dtype=DTYPE)
+        _, index = np.unique(records["step"][::-1], return_index=True)
+        return records[len(records)-1-index]
@@ -1,16 +1,25 @@
-from src.utils import G
+from src.perf import Performance
+from src.telemetry import Telemetry
+from src.utils import G, Y_MIN, newton_y_from_Hs
 from src.irregularSection import IrregularSection
 import numpy as np
 
 class TrapezoidalSection(IrregularSection):
 
+    __slots__ = ("__b", "__s", "__y_max", "__last_y")
+
     def __init__(self, x, z, b, s, z_min=None, y_max=None , up_section=None, down_section=None, granulometry=None, manning=0.013, K_over_tauc=None, tauc_over_rho=None):
         self.__b = b
         self.__s = s
         self.__y_max = 1000 if y_max==None or y_max <= 0 else y_max # MAX_INT
-        points = [(0, self.__y_max), (s*self.__y_max,0), (s*self.__y_max+b, 0), (2*s*self.__y_max+b, self.__y_max)]
-        super().__init__(points, x, z, z_min=z_min, up_section=up_section, down_section=down_section, granulometry=granulometry, manning=manning, K_over_tauc=K_over_tauc, tauc_over_rho=tauc_over_rho)
+        self.__last_y = [None, None] # last solutions of get_y_from_Hs (subcritical, supercritical), used as initial guesses
+        super().__init__(None, x, z, z_min=z_min, up_section=up_section, down_section=down_section, granulometry=granulometry, manning=manning, K_over_tauc=K_over_tauc, tauc_over_rho=tauc_over_rho)
         
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        if not("_TrapezoidalSection__last_y" in state): # profile exported by an older version
+            self.__last_y = [None, None]
+
     def interp_as_up_section(self, other_section, x=None):
         interpolated_section = super().interp(self, other_section, x=x)
         if x==None:
@@ -27,6 +36,22 @@ class TrapezoidalSection(IrregularSection):
         interpolated_section.__s = np.interp(x, [other_section.get_x(), self.get_x()], [other_section.get_s(), self.get_s()])       
         return interpolated_section
 
+    def interp_list_as_up_section(self, other_section, x_list):
+        section_list = super().interp_list_as_up_section(other_section, x_list)
+        xp = [self.get_x(), other_section.get_x()]
+        b_array = np.interp(x_list, xp, [self.get_b(), other_section.get_b()])
+        s_array = np.interp(x_list, xp, [self.get_s(), other_section.get_s()])
+        for section, b, s in zip(section_list, b_array, s_array):
+            section.__b = b
+            section.__s = s
+            section.__last_y = [None, None]
+        return section_list
+
+    def light_copy(self):
+        section = super().light_copy()
+        section.__last_y = [None, None]
+        return section
+
     def copy(self):
         """return a safe copy of this section"""
         return TrapezoidalSection(self.get_x(), self.get_z(), self.get_b(), self.get_s(), z_min=self.get_z_min(), y_max=self.get_y_max(), up_section=self.get_up_section(), down_section=self.get_down_section(), granulometry=self.get_granulometry(), manning=self.get_manning())
@@ -41,17 +66,27 @@ class TrapezoidalSection(IrregularSection):
 
     # getters and setters
 
+    def build_points(self):
+        s, b, y_max = self.__s, self.__b, self.__y_max
+        return [(0, y_max), (s*y_max,0), (s*y_max+b, 0), (2*s*y_max+b, y_max)]
+
+    def get_y_max(self):
+        return self.__y_max
+
     def get_wet_section(self, y):
-        points = self.get_points()    
-        if y >= self.get_y_max():
+        """only used for plots : hydraulic quantities are given by direct formulas"""
+        if y >= self.__y_max:
             print("WARNING : Water depth has gone upper than the maximum one")
-            return points
-        else:
-            return [(self.__s*self.__y_max - self.__s*y, y)] + points[1:-1] + [(self.__s*self.__y_max+self.__b+y*self.__s, y)]
+            return self.build_points()
+        s, b, y_max = self.__s, self.__b, self.__y_max
+        return [(s*y_max - s*y, y), (s*y_max, 0), (s*y_max+b, 0), (s*y_max+b+y*s, y)]
 
     def get_b(self, y=0, wet_points=None):
         return self.__b + 2*self.__s*y
 
+    def get_geometry_key(self):
+        return (self.__b, self.__s)
+
     def set_b(self, b):
         if b <= 0:
             raise ValueError("width b can not be lower than 0")
@@ -75,14 +110,28 @@ class TrapezoidalSection(IrregularSection):
     def get_Hs(self, Q, y, wet_points=None):
         return y + (self.get_V(Q, y)**2)/(2*G)
 
-    def get_Sf(self, Q, y, wet_points=None):
-        return (self.get_manning()*self.get_V(Q, y)/(self.get_R(y)**(2/3)))**2
-
     def get_Fr(self, Q, y, wet_points=None):
         return self.get_V(Q, y)/((G * y)**0.5)
     
+    @Performance.measure_perf
+    def get_y_from_Hs(self, Q, Hs, supercritical, yc=None):
+        """
+        Same as IrregularSection.get_y_from_Hs, solved by a safeguarded Newton method warm-started on the previous solution.
+        brentq is only used if this method fails.
+        """
+        yc = yc if yc != None else self.get_yc(Q)
+        if supercritical:
+            y = newton_y_from_Hs(Q, Hs, self.__b, self.__s, Y_MIN, yc, y0=self.__last_y[1])
+        else:
+            y = newton_y_from_Hs(Q, Hs, self.__b, self.__s, yc, 0.999*self.get_y_max(), y0=self.__last_y[0])
+        if y == None:
+            Telemetry.count("newton_fallback")
+            return super().get_y_from_Hs(Q, Hs, supercritical, yc=yc)
+        self.__last_y[int(supercritical)] = y
+        return y
+
     def get_dP(self, y, wet_points=None):
-        return 2*np.sqrt(A+self.__s**2)
+        return 2*np.sqrt(1+self.__s**2)
 
     def __get_A_for_coussot(self, y):
         return 1.93 - 0.6 * np.arctan((0.4*y/self.get_b(0))**20)
@@ -90,6 +139,9 @@ class TrapezoidalSection(IrregularSection):
     def get_s(self):
         return self.__s
 
+    def is_prismatic(self):
+        return True
+
     # Operators overloading
 
     def __str__(self):
@@ -1,4 +1,5 @@
 import numpy as np
+from src.telemetry import Telemetry
 
 # CONSTANT VALUES
 
@@ -93,6 +94,46 @@ def parse_datafile(filename):
     except FileNotFoundError:
         raise FileNotFoundError()
 
+def load_datafile(filename):
+    """
+    read a txt file of float columns in one go and return a structured array of float64 : column i is data[name_i].
+    If the first line is not made of numbers it is read as the column names, else columns are called f0, f1, ..., fn.
+    Blank lines and lines starting with # are ignored. It raises FileNotFoundError if the file does not exist and ValueError
+    (with the file name and the line) if the data is not a regular table of floats.
+    """
+    with open(filename, 'r') as f:
+        line_number = 0
+        while True:
+            position = f.tell()
+            line = f.readline()
+            line_number += 1
+            if line == "":
+                raise(ValueError(f"no data in {filename}"))
+            if len(line.split()) > 0 and not(line.lstrip().startswith("#")):
+                break
+        first_line = line.split()
+        try:
+            [float(word) for word in first_line]
+            name_list = [f"f{i}" for i in range(len(first_line))]
+            f.seek(position) # the first line is data
+        except ValueError:
+            name_list = first_line
+            line_number += 1
+        if len(set(name_list)) != len(name_list):
+            raise(ValueError(f"column names of {filename} must be unique ({name_list})"))
+        try:
+            table = np.loadtxt(f, dtype=np.float64, ndmin=2)
+        except ValueError as e:
+            raise(ValueError(f"{filename} (data starting on line {line_number}) : {e}"))
+    if table.shape[0] == 0:
+        raise(ValueError(f"no data in {filename}"))
+    if table.shape[1] != len(name_list):
+        raise(ValueError(f"{filename} has {table.shape[1]} columns of data but {len(name_list)} column names ({name_list})"))
+    data = np.empty(table.shape[0], dtype=[(name, np.float64) for name in name_list])
+    for i, name in enumerate(name_list):
+        data[name] = table[:, i]
+    return data
+
 def write_datafile(filename, column_name_list, data):
     """
     write a txt file with as mush column as element in column_name_list (which contains columns' name).
@@ -232,4 +273,43 @@ def real_roots_cubic_function(a, b, c, d):
         if x3 > 0:
             roots.append(x3)
     roots.sort()
-    return roots
\ No newline at end of file
+    return roots
+
+def newton_y_from_Hs(Q, Hs, b, s, y_low, y_high, y0=None, tol=1e-15, maxiter=100):
+    """
+    Solve Hs = y + Q**2 / (2*G*((b+s*y)*y)**2) for y in [y_low, y_high] (specific head of a rectangular (s=0) or trapezoidal section).
+    Newton method safeguarded by bisection : the root is kept bracketed and any Newton step leaving the bracket is replaced by a bisection.
+    y0 is the initial guess (previous solution for instance).
+    Returns None if Hs has no solution in [y_low, y_high] or if the method did not converge.
+    """
+    k = Q**2/(2*G)
+    f_low = y_low + k/((b+s*y_low)*y_low)**2 - Hs
+    f_high = y_high + k/((b+s*y_high)*y_high)**2 - Hs
+    if f_low == 0:
+        return y_low
+    if f_high == 0:
+        return y_high
+    if (f_low > 0) == (f_high > 0) or f_low != f_low or f_high != f_high: # no sign change (or nan)
+        return None
+    y = y0 if (y0 != None and y_low < y0 < y_high) else 0.5*(y_low+y_high)
+    for iteration in range(1, maxiter+1):
+        area = (b+s*y)*y
+        f = y + k/area**2 - Hs
+        if f == 0:
+            Telemetry.count("newton_iteration", iteration)
+            return y
+        if (f > 0) == (f_low > 0):
+            y_low = y
+        else:
+            y_high = y
+        df = 1 - 2*k*(b+2*s*y)/area**3
+        y_next = y - f/df if df != 0 else y_low
+        if not(y_low < y_next < y_high):
+            y_next = 0.5*(y_low+y_high)
+        if abs(y_next-y) <= tol*(1+y):
+            Telemetry.count("newton_iteration", iteration)
+            return y_next
+        y = y_next
+    Telemetry.count("newton_iteration", maxiter)
+    return None
+